@@ -0,0 +1,185 @@
+import logging
+import re
+import threading
+import time
+import redis
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most important first
+CRITICAL = "critical"
+NORMAL = "normal"
+LOW = "low"
+
+# Share of an upstream's concurrency limit each priority may use; lower
+# priorities are shed first as the upstream fills up
+PRIORITY_SHARES = {
+    CRITICAL: 1.0,
+    NORMAL: Config.ADMISSION_NORMAL_SHARE,
+    LOW: Config.ADMISSION_LOW_SHARE,
+}
+
+# (methods, path pattern, priority, route bucket); first match wins.
+# A route bucket name refers to ROUTE_RATE_LIMITS.
+PRIORITY_RULES = [
+    ({"POST"}, re.compile(r"^/api/auth/(login|register)$"), CRITICAL, None),
+    ({"PUT"}, re.compile(r"^/api/tournaments/\d+/bracket/\d+/result$"), CRITICAL, None),
+    ({"GET"}, re.compile(r"^/api/tournaments/leaderboard$"), LOW, "leaderboard"),
+    ({"GET"}, re.compile(r"^/api/tournaments/?$"), LOW, None),
+    ({"GET"}, re.compile(r"^/api/tournaments/\d+/brackets?$"), LOW, None),
+    ({"POST", "PUT", "PATCH", "DELETE"}, re.compile(r"^/api/"), CRITICAL, None),
+]
+
+# Cluster-wide token buckets per route: name -> (tokens per second, burst)
+ROUTE_RATE_LIMITS = {
+    "leaderboard": (Config.RATE_LIMIT_LEADERBOARD_RATE, Config.RATE_LIMIT_LEADERBOARD_BURST),
+}
+
+
+def classify(method, path):
+    """Return (priority, route bucket name) for a request"""
+    for methods, pattern, priority, bucket in PRIORITY_RULES:
+        if method in methods and pattern.match(path):
+            return priority, bucket
+    return NORMAL, None
+
+
+# Refill and take one token from each bucket atomically. KEYS are bucket keys,
+# ARGV is now followed by a (rate, burst) pair per key. Returns 1 when every
+# bucket had a token, otherwise 0 and no bucket is charged.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local states = {}
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[i * 2])
+    local burst = tonumber(ARGV[i * 2 + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    if tokens < 1 then
+        return 0
+    end
+    states[i] = {tokens - 1, math.ceil(burst / rate) + 1}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', states[i][1], 'ts', now)
+    redis.call('EXPIRE', key, states[i][2])
+end
+return 1
+"""
+
+
+class LocalTokenBuckets:
+    """In-process token buckets used while Redis is unreachable"""
+
+    def __init__(self, max_buckets=10000):
+        self.max_buckets = max_buckets
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, limits):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.clear()
+            states = []
+            for key, (rate, burst) in limits:
+                tokens, ts = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - ts) * rate)
+                if tokens < 1:
+                    return False
+                states.append((key, tokens - 1))
+            for key, tokens in states:
+                self._buckets[key] = (tokens, now)
+            return True
+
+
+class RateLimiter:
+    """Redis-backed token buckets shared by all gateway replicas"""
+
+    def __init__(self):
+        self._client = None
+        self._script = None
+        self._local = LocalTokenBuckets()
+        self._redis_retry_at = 0.0
+
+    def take(self, limits):
+        """Take one token from every (key, (rate, burst)) bucket, all or nothing"""
+        if not limits:
+            return True
+        if time.monotonic() >= self._redis_retry_at:
+            try:
+                if self._script is None:
+                    self._client = redis.from_url(
+                        Config.REDIS_URL, socket_timeout=0.05, socket_connect_timeout=0.05
+                    )
+                    self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+                args = [time.time()]
+                for _, (rate, burst) in limits:
+                    args.extend([rate, burst])
+                return bool(self._script(keys=[key for key, _ in limits], args=args))
+            except redis.RedisError as e:
+                # Fall back to per-replica buckets for a while instead of failing requests
+                logger.warning(f"Rate limiter falling back to local buckets: {e}")
+                self._redis_retry_at = time.monotonic() + 5
+        return self._local.take(limits)
+
+
+rate_limiter = RateLimiter()
+
+
+def check_rate_limits(client_id, route_bucket):
+    """Return True when the client and route buckets allow the request"""
+    limits = [(f"ratelimit:client:{client_id}", (Config.RATE_LIMIT_CLIENT_RATE, Config.RATE_LIMIT_CLIENT_BURST))]
+    if route_bucket in ROUTE_RATE_LIMITS:
+        limits.append((f"ratelimit:route:{route_bucket}", ROUTE_RATE_LIMITS[route_bucket]))
+    return rate_limiter.take(limits)
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit for one upstream, driven by observed latency
+
+    The limit grows by one per window of successful calls and shrinks by
+    ADMISSION_BACKOFF_RATIO when latency rises well above the no-load latency
+    or calls fail.
+    """
+
+    def __init__(self):
+        self.limit = float(Config.ADMISSION_INITIAL_LIMIT)
+        self.min_latency = None
+        self.last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, latency, failed=False):
+        with self._lock:
+            if not failed:
+                if self.min_latency is None or latency < self.min_latency:
+                    self.min_latency = latency
+                else:
+                    # Let the no-load estimate drift so one lucky sample does not stick
+                    self.min_latency += (latency - self.min_latency) * 0.001
+
+            congested = failed or (
+                latency > Config.ADMISSION_LATENCY_FLOOR
+                and latency > self.min_latency * Config.ADMISSION_LATENCY_TOLERANCE
+            )
+            now = time.monotonic()
+            if congested:
+                # At most one decrease per interval so a burst of slow calls is one signal
+                if now - self.last_decrease >= Config.ADMISSION_DECREASE_INTERVAL:
+                    self.limit = max(Config.ADMISSION_MIN_LIMIT, self.limit * Config.ADMISSION_BACKOFF_RATIO)
+                    self.last_decrease = now
+            else:
+                self.limit = min(Config.ADMISSION_MAX_LIMIT, self.limit + 1.0 / self.limit)
+
+    def admits(self, in_flight, priority):
+        """Whether a request of this priority fits under the current limit"""
+        return in_flight < self.limit * PRIORITY_SHARES.get(priority, 1.0)
+
+    def stats(self):
+        return {
+            "limit": round(self.limit, 1),
+            "min_latency_ms": round(self.min_latency * 1000, 2) if self.min_latency is not None else None,
+        }
@@ -1,12 +1,20 @@
-from flask import Flask, request, send_from_directory
+from flask import Flask, request
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 from .config import Config
 from .gateway import get_target_service, proxy_request
+from .batch import handle_batch
+from .upstream import get_pool_stats
+from .cache import response_cache
+from .coalesce import single_flight
+from .metrics import init_metrics
+from .tracing import init_tracing
+from .static_assets import create_manifest, serve_asset
 
-def create_app():
-    """Create and configure the API Gateway Flask app"""
+def get_static_dir():
+    """Locate the static files directory"""
     # Static files are mounted at /app/static in the container (via docker-compose volumes)
     static_dir = '/app/static'
     
@@ -14,20 +22,57 @@ def create_app():
     if not os.path.exists(static_dir):
         root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
         static_dir = os.path.join(root_dir, "static")
-    
-    app = Flask(__name__, static_folder=static_dir, static_url_path="")
+    return static_dir
+
+def create_app():
+    """Create and configure the API Gateway Flask app"""
+    static_dir = get_static_dir()
+    # Static files are served from an in-memory manifest rather than Flask's
+    # static route, which would shadow the .html fallback below
+    app = Flask(__name__, static_folder=None)
     app.config.from_object(Config)
 
+    # Trust X-Forwarded-For only as far as our own proxies
+    if Config.TRUSTED_PROXY_HOPS:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=Config.TRUSTED_PROXY_HOPS)
+
     # CORS
     CORS(app, origins=app.config.get("CORS_ORIGINS"))
 
     # JWT for token validation
     JWTManager(app)
 
+    # Metrics and tracing: per-route latency and upstream call timings
+    init_metrics(app)
+    init_tracing(app)
+
+    manifest = create_manifest(static_dir)
+
+    def asset_response(asset):
+        status, headers, body = serve_asset(
+            asset, request.headers.get("Accept-Encoding"), request.headers.get("If-None-Match")
+        )
+        return app.response_class(body, status=status, headers=headers)
+
     @app.route("/healthz")
     def healthz():
         return {"status": "ok", "service": "api-gateway"}, 200
 
+    @app.route("/healthz/upstreams")
+    def upstream_stats():
+        """Expose upstream connection pool usage"""
+        return {"upstreams": get_pool_stats()}, 200
+
+    @app.route("/healthz/cache")
+    def cache_stats():
+        """Expose response cache usage"""
+        return {"cache": response_cache.stats(), "coalescing": single_flight.stats()}, 200
+
+    @app.route("/api/batch", methods=["POST"])
+    def api_batch():
+        """Run several GET API calls concurrently in one round trip"""
+        return handle_batch(app)
+
     @app.route("/api/<path:path>", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
     def api_proxy(path):
         """Route API requests to appropriate microservice"""
@@ -38,12 +83,11 @@ def create_app():
     @app.route("/")
     def index():
         """Serve the main index.html"""
-        try:
-            return send_from_directory(app.static_folder, "index.html")
-        except Exception as e:
-            app.logger.error(f"Error serving index.html: {e}")
-            app.logger.error(f"Static folder: {app.static_folder}")
-            return {"error": "Static files not found", "static_folder": app.static_folder}, 404
+        asset = manifest.lookup("index.html")
+        if asset is None:
+            app.logger.error(f"index.html not found in static folder: {static_dir}")
+            return {"error": "Static files not found", "static_folder": static_dir}, 404
+        return asset_response(asset)
 
     @app.route("/<path:path>")
     def static_files(path):
@@ -51,29 +95,20 @@ def create_app():
         # Don't serve API routes as static files
         if path.startswith('api/'):
             return {"error": "Not found"}, 404
-        
-        try:
-            # Try to serve the exact file requested
-            file_path = os.path.join(app.static_folder, path)
-            if os.path.isfile(file_path):
-                return send_from_directory(app.static_folder, path)
-            
-            # If no file extension and not found, try adding .html
-            if '.' not in path:
-                html_path = f"{path}.html"
-                html_file = os.path.join(app.static_folder, html_path)
-                if os.path.isfile(html_file):
-                    return send_from_directory(app.static_folder, html_path)
-            
-            # Not found
+
+        # Exact file, fingerprinted alias, or the .html page for a bare name
+        asset = manifest.lookup(path)
+        if asset is None:
             app.logger.warning(f"Static file not found: {path}")
             return {"error": "File not found", "path": path}, 404
-        except Exception as e:
-            app.logger.error(f"Error serving static file {path}: {e}")
-            return {"error": "Internal server error"}, 500
+        return asset_response(asset)
 
     return app
 
 if __name__ == "__main__":
-    app = create_app()
-    app.run(host="0.0.0.0", port=8000, debug=True)
+    if Config.GATEWAY_ENGINE == "asyncio":
+        from .async_app import run
+        run(host="0.0.0.0", port=8000)
+    else:
+        app = create_app()
+        app.run(host="0.0.0.0", port=8000, debug=True)
@@ -0,0 +1,331 @@
+# Asyncio API Gateway
+#
+# Alternative runtime for the gateway built on aiohttp. It shares the routing
+# table, timeouts, edge auth, rate limits, response cache and static file
+# layout with the Flask app, but each in-flight upstream call is a coroutine
+# instead of a pinned worker thread.
+import asyncio
+import math
+import time
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector, ClientError
+from flask import Flask
+from flask_jwt_extended import JWTManager
+from .config import Config
+from .gateway import get_target_service, has_ambiguous_framing, is_cacheable, HOP_BY_HOP_HEADERS, INTERNAL_HEADERS
+from .edge_auth import verify_request_token, sign_claims, get_user_scope
+from .admission import classify, check_rate_limits
+from .cache import CachedResponse, response_cache, get_cache_rule, get_cache_key, invalidate_for_write
+from .coalesce import async_single_flight
+from .compression import negotiate_encoding, is_compressible, compress_response
+from .upstream import get_timeout, get_upstream, get_pool_stats
+from .app import get_static_dir
+from .static_assets import create_manifest, serve_asset
+
+@web.middleware
+async def cors_preflight_middleware(request, handler):
+    """Answer CORS preflight requests without routing them"""
+    if request.method == "OPTIONS" and "Access-Control-Request-Method" in request.headers:
+        response = web.Response(status=200)
+        response.headers["Access-Control-Allow-Methods"] = "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+        requested_headers = request.headers.get("Access-Control-Request-Headers")
+        if requested_headers:
+            response.headers["Access-Control-Allow-Headers"] = requested_headers
+        return response
+    return await handler(request)
+
+
+async def add_cors_headers(request, response):
+    """Mirror the Flask-CORS behaviour for the configured origins"""
+    origin = request.headers.get("Origin")
+    if not origin:
+        return
+    if "*" in Config.CORS_ORIGINS:
+        response.headers["Access-Control-Allow-Origin"] = "*"
+    elif origin in Config.CORS_ORIGINS:
+        response.headers["Access-Control-Allow-Origin"] = origin
+        response.headers["Vary"] = "Origin"
+
+
+async def healthz(request):
+    return web.json_response({"status": "ok", "service": "api-gateway", "engine": "asyncio"})
+
+
+async def upstream_stats(request):
+    """Expose upstream replica load"""
+    return web.json_response({"upstreams": get_pool_stats()})
+
+
+async def cache_stats(request):
+    """Expose response cache usage"""
+    return web.json_response({"cache": response_cache.stats(), "coalescing": async_single_flight.stats()})
+
+
+def json_error(error):
+    """web.Response for an error tuple of (body, status[, headers])"""
+    body, status, *headers = error
+    return web.json_response(body, status=status, headers=headers[0] if headers else None)
+
+
+def get_peer_address(request):
+    """The client address, trusting X-Forwarded-For only as far as our own proxies
+
+    Same rule as ProxyFix in the Flask app: with TRUSTED_PROXY_HOPS set, take
+    that many entries from the right, otherwise the socket peer.
+    """
+    hops = Config.TRUSTED_PROXY_HOPS
+    if hops:
+        forwarded = [
+            part.strip() for value in request.headers.getall("X-Forwarded-For", ()) for part in value.split(",")
+        ]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.remote
+
+
+def get_client_id(request, claims):
+    """Identify the caller for rate limiting: the user if known, else the client IP"""
+    if claims and claims.get("sub"):
+        return f"user:{claims['sub']}"
+    return f"ip:{get_peer_address(request)}"
+
+
+async def send_upstream(request, upstream, priority, headers, data, timeout):
+    """Admit and send the request; returns ((endpoint, response), error)"""
+    # Shed lower-priority traffic first once the upstream nears its limit
+    if Config.ADMISSION_ENABLED and not upstream.admits(priority):
+        return None, ({"error": "Service overloaded, try again shortly"}, 503, {"Retry-After": "1"})
+
+    endpoint = upstream.acquire()
+    if endpoint is None:
+        # Fail fast while every replica is ejected instead of waiting on timeouts
+        return None, ({"error": "Service unavailable: circuit open"}, 503, {"Retry-After": str(math.ceil(upstream.retry_after()))})
+    started = time.monotonic()
+    try:
+        upstream_response = await request.app["client"].request(
+            request.method,
+            f"{endpoint.url}{request.path}",
+            params=request.query,
+            headers=headers,
+            data=data,
+            allow_redirects=False,
+            timeout=timeout,
+        )
+    except (ClientError, TimeoutError) as e:
+        upstream.observe(endpoint, time.monotonic() - started, failed=True)
+        upstream.release(endpoint)
+        return None, ({"error": f"Service unavailable: {str(e)}"}, 503)
+    upstream.observe(endpoint, time.monotonic() - started, failed=upstream_response.status >= 500)
+    return (endpoint, upstream_response), None
+
+
+async def fetch_cacheable(request, upstream, priority, headers, timeout, cache_rule, cache_key):
+    """Fetch a cacheable GET and store it; returns (CachedResponse, error)"""
+    # Entries are compressed per client, so ask the upstream for the plain body
+    headers = {key: value for key, value in headers.items() if key.lower() != "accept-encoding"}
+    headers["Accept-Encoding"] = "identity"
+    sent, error = await send_upstream(request, upstream, priority, headers, None, timeout)
+    if error:
+        return None, error
+    endpoint, upstream_response = sent
+    try:
+        body = await upstream_response.read()
+    except (ClientError, TimeoutError) as e:
+        return None, ({"error": f"Service unavailable: {str(e)}"}, 503)
+    finally:
+        upstream_response.release()
+        upstream.release(endpoint)
+
+    response_headers = [
+        (name, value) for name, value in upstream_response.headers.items()
+        if name.lower() not in ("content-length", "transfer-encoding", "connection")
+    ]
+    entry = CachedResponse(upstream_response.status, response_headers, body, cache_rule["ttl"], cache_rule["tags"])
+    if is_cacheable(entry.status, response_headers):
+        response_cache.set(cache_key, entry)
+    return entry, None
+
+
+async def api_proxy(request):
+    """Route API requests to appropriate microservice"""
+    full_path = request.path
+    service_url, _ = get_target_service(full_path)
+    if not service_url:
+        return web.json_response({"error": "Service not found"}, status=404)
+    if has_ambiguous_framing(request.headers):
+        return web.json_response({"error": "Content-Length and Transfer-Encoding must not both be set"}, status=400)
+
+    # Reject bad tokens here instead of after a proxy hop; decode_token reads
+    # the JWT settings from a Flask app context
+    authorization = request.headers.get("Authorization")
+    with request.app["jwt_app"].app_context():
+        claims, error = verify_request_token(full_path, authorization)
+    if error:
+        return json_error(error)
+
+    # Token buckets per client and per route, shared across gateway replicas;
+    # the Redis call is blocking, so it runs off the event loop
+    priority, route_bucket = classify(request.method, full_path)
+    if Config.ADMISSION_ENABLED and not await asyncio.to_thread(
+        check_rate_limits, get_client_id(request, claims), route_bucket
+    ):
+        return web.json_response({"error": "Too many requests"}, status=429, headers={"Retry-After": "1"})
+
+    # Clients must never supply the internal headers themselves
+    headers = {
+        key: value for key, value in request.headers.items()
+        if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() not in INTERNAL_HEADERS
+    }
+    if claims and Config.INTERNAL_AUTH_SECRET:
+        headers.update(sign_claims(claims))
+
+    connect_timeout, read_timeout = get_timeout(full_path)
+    timeout = ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+    accept_encoding = request.headers.get("Accept-Encoding")
+    upstream = get_upstream(service_url)
+
+    # Serve hot GET routes from the response cache when possible
+    cache_rule = get_cache_rule(request.method, full_path)
+    if cache_rule:
+        cache_key = get_cache_key(
+            cache_rule, full_path, request.rel_url.raw_query_string, get_user_scope(claims, authorization), bool(claims)
+        )
+        entry = response_cache.get(cache_key)
+        cache_status = "HIT"
+        if entry is None:
+            # Identical concurrent misses wait for one upstream call and share its response
+            try:
+                (entry, error), shared = await async_single_flight.do(
+                    cache_key,
+                    lambda: fetch_cacheable(request, upstream, priority, headers, timeout, cache_rule, cache_key),
+                )
+            except TimeoutError:
+                return web.json_response({"error": "Upstream request timed out"}, status=504)
+            if error:
+                return json_error(error)
+            cache_status = "COALESCED" if shared else "MISS"
+        # Compress through the entry so every waiter and later hits reuse the result
+        response_headers, body = compress_response(entry.status, entry.headers, entry.body, accept_encoding, entry.encoded)
+        return web.Response(body=body, status=entry.status, headers=response_headers + [("X-Cache", cache_status)])
+
+    data = None
+    if request.body_exists:
+        data = request.content.iter_chunked(Config.PROXY_CHUNK_SIZE)
+    sent, error = await send_upstream(request, upstream, priority, headers, data, timeout)
+    if error:
+        return json_error(error)
+    endpoint, upstream_response = sent
+
+    if request.method not in ("GET", "HEAD", "OPTIONS") and upstream_response.status < 400:
+        invalidate_for_write(full_path)
+
+    try:
+        upstream_headers = [
+            (name, value) for name, value in upstream_response.headers.items()
+            if name.lower() not in ("transfer-encoding", "connection")
+        ]
+        if (
+            request.method != "HEAD"
+            and upstream_response.content_length is not None
+            and negotiate_encoding(accept_encoding) is not None
+            and is_compressible(upstream_response.status, upstream_headers, upstream_response.content_length)
+        ):
+            # Small enough to buffer: compress it for the client
+            try:
+                body = await upstream_response.read()
+            except (ClientError, TimeoutError) as e:
+                return web.json_response({"error": f"Service unavailable: {str(e)}"}, status=503)
+            response_headers, body = compress_response(
+                upstream_response.status, upstream_headers, body, accept_encoding
+            )
+            return web.Response(body=body, status=upstream_response.status, headers=response_headers)
+
+        # The body is relayed undecoded, so encoding and length stay valid
+        response = web.StreamResponse(status=upstream_response.status)
+        for name, value in upstream_headers:
+            response.headers.add(name, value)
+        await response.prepare(request)
+        async for chunk in upstream_response.content.iter_chunked(Config.PROXY_CHUNK_SIZE):
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+    finally:
+        upstream_response.release()
+        upstream.release(endpoint)
+
+
+def asset_response(request, asset):
+    status, headers, body = serve_asset(
+        asset, request.headers.get("Accept-Encoding"), request.headers.get("If-None-Match")
+    )
+    return web.Response(body=body, status=status, headers=headers)
+
+
+async def index(request):
+    """Serve the main index.html"""
+    asset = request.app["static_manifest"].lookup("index.html")
+    if asset is None:
+        return web.json_response(
+            {"error": "Static files not found", "static_folder": request.app["static_dir"]}, status=404
+        )
+    return asset_response(request, asset)
+
+
+async def static_files(request):
+    """Serve static files (CSS, JS, images, HTML pages, etc.)"""
+    path = request.match_info["path"]
+
+    # Exact file, fingerprinted alias, or the .html page for a bare name
+    asset = request.app["static_manifest"].lookup(path)
+    if asset is None:
+        return web.json_response({"error": "File not found", "path": path}, status=404)
+    return asset_response(request, asset)
+
+
+async def _client_session(app):
+    """Open the shared upstream client for the lifetime of the app"""
+    connector = TCPConnector(
+        limit=0,
+        limit_per_host=Config.ASYNC_UPSTREAM_LIMIT_PER_HOST,
+        keepalive_timeout=Config.ASYNC_KEEPALIVE_TIMEOUT,
+    )
+    # auto_decompress=False keeps upstream bodies byte-for-byte for passthrough
+    app["client"] = ClientSession(connector=connector, auto_decompress=False)
+    yield
+    await app["client"].close()
+
+
+def create_jwt_app():
+    """Flask app that only holds the JWT settings for verifying tokens at the edge"""
+    jwt_app = Flask(__name__)
+    jwt_app.config.from_object(Config)
+    JWTManager(jwt_app)
+    return jwt_app
+
+
+def create_async_app():
+    """Create and configure the asyncio API Gateway app"""
+    app = web.Application(middlewares=[cors_preflight_middleware])
+    app["jwt_app"] = create_jwt_app()
+    # Headers must be added before streamed responses are prepared
+    app.on_response_prepare.append(add_cors_headers)
+    app["static_dir"] = get_static_dir()
+    app["static_manifest"] = create_manifest(app["static_dir"])
+    app.cleanup_ctx.append(_client_session)
+
+    methods = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/healthz/upstreams", upstream_stats)
+    app.router.add_get("/healthz/cache", cache_stats)
+    for method in methods:
+        app.router.add_route(method, "/api/{path:.*}", api_proxy)
+    app.router.add_get("/", index)
+    app.router.add_get("/{path:.+}", static_files)
+    return app
+
+
+def run(host="0.0.0.0", port=8000):
+    web.run_app(create_async_app(), host=host, port=port)
+
+
+if __name__ == "__main__":
+    run()
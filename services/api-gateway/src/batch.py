@@ -0,0 +1,123 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from flask import request, Response
+from werkzeug.test import EnvironBuilder
+from .config import Config
+from .gateway import get_target_service, proxy_request
+from .compression import compress_response
+from .tracing import outgoing_headers
+
+BATCH_PATH = "/api/batch"
+
+# Outer request headers that describe the batch body rather than each sub-request
+EXCLUDED_HEADERS = {"content-type", "content-length", "transfer-encoding", "accept-encoding"}
+
+# Started lazily once per process so pre-forked workers each get their own pool
+_batch_executor = None
+_batch_pid = None
+
+
+def get_batch_executor():
+    global _batch_executor, _batch_pid
+    if _batch_pid != os.getpid():
+        _batch_executor = ThreadPoolExecutor(max_workers=Config.BATCH_MAX_WORKERS, thread_name_prefix="batch")
+        _batch_pid = os.getpid()
+    return _batch_executor
+
+
+def parse_batch(payload):
+    """Validate a batch body; returns (sub-requests, error message)"""
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list):
+        return None, "Body must be an object with a 'requests' list"
+    items = payload["requests"]
+    if not items:
+        return None, "'requests' must not be empty"
+    if len(items) > Config.BATCH_MAX_REQUESTS:
+        return None, f"At most {Config.BATCH_MAX_REQUESTS} requests per batch"
+
+    sub_requests = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("path"), str):
+            return None, f"Request {index} must be an object with a 'path'"
+        method = str(item.get("method", "GET")).upper()
+        if method != "GET":
+            # Sub-requests run in parallel, so only reads are safe to batch
+            return None, f"Request {index}: only GET is supported in a batch"
+        url = urlsplit(item["path"])
+        if not url.path.startswith("/api/") or url.path == BATCH_PATH:
+            return None, f"Request {index}: path must be an /api/ route"
+        sub_requests.append({
+            "id": item.get("id", index),
+            "path": url.path,
+            "query_string": url.query,
+        })
+    return sub_requests, None
+
+
+def run_sub_request(app, environ_base, headers, sub_request):
+    """Send one sub-request through the regular proxy pipeline"""
+    builder = EnvironBuilder(
+        path=sub_request["path"],
+        query_string=sub_request["query_string"],
+        method="GET",
+        headers=headers,
+        environ_base=environ_base,
+    )
+    with app.request_context(builder.get_environ()):
+        service_url, _ = get_target_service(sub_request["path"])
+        response = app.make_response(proxy_request(service_url, sub_request["path"]))
+        try:
+            body = b"".join(response.iter_encoded())
+        finally:
+            response.close()
+
+    if response.mimetype == "application/json":
+        try:
+            body = json.loads(body)
+        except ValueError:
+            body = body.decode("utf-8", "replace")
+    else:
+        body = body.decode("utf-8", "replace")
+    return {"id": sub_request["id"], "status": response.status_code, "body": body}
+
+
+def handle_batch(app):
+    """Dispatch GET sub-requests concurrently and return all results at once
+
+    Each sub-request goes through edge auth, rate limits, the response cache
+    and admission exactly like a standalone call, with the caller's headers.
+    """
+    sub_requests, error = parse_batch(request.get_json(silent=True))
+    if error:
+        return {"error": error}, 400
+
+    # Sub-requests continue the batch request's trace
+    trace_headers = outgoing_headers()
+    replaced = EXCLUDED_HEADERS | {key.lower() for key in trace_headers}
+    headers = [
+        (key, value) for key, value in request.headers
+        if key.lower() not in replaced
+    ]
+    headers.extend(trace_headers.items())
+    headers.append(("Accept-Encoding", "identity"))
+    environ_base = {"REMOTE_ADDR": request.remote_addr}
+
+    executor = get_batch_executor()
+    futures = [
+        executor.submit(run_sub_request, app, environ_base, headers, sub_request)
+        for sub_request in sub_requests
+    ]
+    responses = []
+    for sub_request, future in zip(sub_requests, futures):
+        try:
+            responses.append(future.result())
+        except Exception as e:
+            app.logger.error(f"Batch sub-request {sub_request['path']} failed: {e}")
+            responses.append({"id": sub_request["id"], "status": 500, "body": {"error": "Internal server error"}})
+    body = json.dumps({"responses": responses}).encode()
+    response_headers, body = compress_response(
+        200, [("Content-Type", "application/json")], body, request.headers.get("Accept-Encoding")
+    )
+    return Response(body, 200, response_headers)
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import redis
+from .config import Config
+from .compression import compress
+
+logger = logging.getLogger(__name__)
+
+# Who may share a cached response: everyone, any caller whose token the edge
+# verified, or only the same user
+PUBLIC_SCOPE = "public"
+AUTHENTICATED_SCOPE = "authenticated"
+USER_SCOPE = "user"
+
+# Cacheable GET routes: TTL in seconds, who may share a response, and the
+# resources whose changes invalidate it. Concurrent misses for the same key
+# are coalesced into one upstream call.
+CACHE_RULES = [
+    {
+        "pattern": re.compile(r"^/api/tournaments/leaderboard$"),
+        "ttl": Config.CACHE_TTL_LEADERBOARD,
+        "scope": PUBLIC_SCOPE,
+        "tags": ["tournaments"],
+    },
+    {
+        "pattern": re.compile(r"^/api/tournaments/?$"),
+        "ttl": Config.CACHE_TTL_TOURNAMENTS,
+        "scope": USER_SCOPE,
+        "tags": ["tournaments"],
+    },
+    {
+        "pattern": re.compile(r"^/api/users/me$"),
+        "ttl": Config.CACHE_TTL_USER_ME,
+        "scope": USER_SCOPE,
+        "tags": ["users"],
+    },
+    {
+        # Spectators refetch the bracket together after every result
+        "pattern": re.compile(r"^/api/tournaments/\d+/brackets?$"),
+        "ttl": Config.CACHE_TTL_BRACKET,
+        "scope": AUTHENTICATED_SCOPE,
+        "tags": ["tournaments"],
+    },
+]
+
+# Successful writes through the gateway invalidate these resources immediately.
+# Only the auth routes that change user records are listed: login and token
+# validation are POSTs as well, but they change nothing that is cached.
+WRITE_INVALIDATION = {
+    "/api/tournaments": ["tournaments"],
+    "/api/users": ["users"],
+    "/api/auth/register": ["users"],
+    "/api/auth/create_admin": ["users"],
+    "/api/auth/sync-approval": ["users"],
+    "/api/auth/sync-ban": ["users"],
+}
+
+
+class CachedResponse:
+    """Buffered upstream response held in the cache"""
+
+    def __init__(self, status, headers, body, ttl, tags):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = time.monotonic() + ttl
+        self.tags = tags
+        self.variants = {}
+
+    def encoded(self, encoding):
+        """Compressed copy of the body, built once per encoding on first use"""
+        if encoding not in self.variants:
+            self.variants[encoding] = compress(self.body, encoding)
+        return self.variants[encoding]
+
+    @property
+    def size(self):
+        return len(self.body)
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of responses with TTL and tag invalidation"""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            # Evict least recently used entries until both bounds hold
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def invalidate(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry.size
+        for tag in entry.tags:
+            keys = self._tags.get(tag)
+            if keys:
+                keys.discard(key)
+
+
+response_cache = ResponseCache(Config.CACHE_MAX_ENTRIES, Config.CACHE_MAX_BYTES)
+
+
+def get_cache_rule(method, path):
+    """Return the cache rule for a request, if it is cacheable"""
+    if not Config.CACHE_ENABLED or method != "GET":
+        return None
+    for rule in CACHE_RULES:
+        if rule["pattern"].match(path):
+            ensure_invalidation_listener()
+            return rule
+    return None
+
+
+def get_cache_key(rule, path, query_string, user_scope, verified):
+    """Build the cache key; non-public routes are keyed by the caller
+
+    Callers whose token was verified at the edge share responses on
+    authenticated routes; anyone else is keyed by their own token so a bad
+    token never receives another caller's response.
+    """
+    if rule["scope"] == PUBLIC_SCOPE:
+        scope = PUBLIC_SCOPE
+    elif rule["scope"] == AUTHENTICATED_SCOPE and verified:
+        scope = AUTHENTICATED_SCOPE
+    else:
+        scope = user_scope
+    return f"{path}?{query_string}|{scope}"
+
+
+def invalidate_for_write(path):
+    """Drop cached responses affected by a successful write through this gateway"""
+    for prefix, tags in WRITE_INVALIDATION.items():
+        if path.startswith(prefix):
+            for tag in tags:
+                response_cache.invalidate(tag)
+
+
+# Redis invalidation listener, started lazily once per process so that
+# pre-forked workers each get their own subscriber thread
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def ensure_invalidation_listener():
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        thread = threading.Thread(target=_listen_for_invalidations, daemon=True)
+        thread.start()
+
+
+def _listen_for_invalidations():
+    """Apply invalidation messages published by the services"""
+    backoff = 1
+    while True:
+        try:
+            client = redis.from_url(Config.REDIS_URL)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(Config.CACHE_INVALIDATION_CHANNEL)
+            # Anything published while we were disconnected was missed
+            response_cache.clear()
+            backoff = 1
+            for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                    resource = data.get("resource")
+                    if resource:
+                        response_cache.invalidate(resource)
+                except (ValueError, AttributeError) as e:
+                    logger.warning(f"Ignoring malformed invalidation message: {e}")
+        except redis.RedisError as e:
+            logger.warning(f"Cache invalidation listener disconnected: {e}")
+            response_cache.clear()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
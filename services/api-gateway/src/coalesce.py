@@ -0,0 +1,99 @@
+import asyncio
+import threading
+from .config import Config
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait for and share its result instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Return (result, shared); raises TimeoutError if the leader takes too long"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(Config.COALESCE_WAIT_TIMEOUT):
+                raise TimeoutError(f"Timed out waiting for in-flight request {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop
+
+    The call runs as its own task, so a leader whose client goes away does not
+    cancel it for the callers waiting on the same key.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """Return (result, shared); raises TimeoutError if the leader takes too long"""
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), Config.COALESCE_WAIT_TIMEOUT if shared else None)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Timed out waiting for in-flight request {key}")
+        return result, shared
+
+    def _forget(self, key, task):
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            # Mark the error retrieved even when every caller has gone away
+            task.exception()
+
+    def stats(self):
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
@@ -0,0 +1,93 @@
+import gzip
+import re
+from .config import Config
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Content types worth compressing
+COMPRESSIBLE_TYPES = re.compile(r"^(text/|application/([\w.+-]+\+)?(json|javascript|xml)|image/svg\+xml)")
+
+# Most preferred first
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding, available=SUPPORTED_ENCODINGS):
+    """Pick the best available content coding the client accepts"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=Config.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=Config.COMPRESSION_GZIP_LEVEL)
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def is_compressible(status, headers, size):
+    """Whether a response of this size and these headers should be compressed"""
+    if not Config.COMPRESSION_ENABLED or status in (204, 304) or size is None:
+        return False
+    if size < Config.COMPRESSION_MIN_SIZE or size > Config.COMPRESSION_MAX_SIZE:
+        return False
+    if _header(headers, "content-encoding"):
+        return False
+    if "no-transform" in (_header(headers, "cache-control") or ""):
+        return False
+    return bool(COMPRESSIBLE_TYPES.match(_header(headers, "content-type") or ""))
+
+
+def add_vary(headers):
+    """Mark a response as negotiated on Accept-Encoding"""
+    vary = _header(headers, "vary")
+    if vary is None:
+        return headers + [("Vary", "Accept-Encoding")]
+    if "accept-encoding" in vary.lower() or vary.strip() == "*":
+        return headers
+    return [
+        (key, f"{value}, Accept-Encoding" if key.lower() == "vary" else value)
+        for key, value in headers
+    ]
+
+
+def compress_response(status, headers, body, accept_encoding, encoded=None):
+    """Return (headers, body) compressed for the client when worthwhile
+
+    encoded(encoding) may supply an already compressed body, e.g. from the cache.
+    """
+    if not is_compressible(status, headers, len(body)):
+        return headers, body
+    headers = add_vary(headers)
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return headers, body
+    compressed = encoded(encoding) if encoded else compress(body, encoding)
+    headers = [
+        # The compressed bytes differ, so a strong validator becomes weak
+        (key, f"W/{value}" if key.lower() == "etag" and not value.startswith("W/") else value)
+        for key, value in headers
+        if key.lower() != "content-length"
+    ]
+    return headers + [("Content-Encoding", encoding)], compressed
@@ -1,5 +1,23 @@
 import os
 
+
+def _parse_route_timeouts(value):
+    """Parse "prefix=connect:read,..." into {prefix: (connect, read)}"""
+    timeouts = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        prefix, _, pair = item.partition("=")
+        connect, _, read = pair.partition(":")
+        timeouts[prefix.strip()] = (float(connect), float(read or connect))
+    return timeouts
+
+
+def _parse_list(value):
+    """Parse a comma-separated list, dropping blanks"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "api-gateway-secret")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-secret-key")
@@ -12,3 +30,116 @@ class Config:
     USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user-service:8002")
     TOURNAMENT_SERVICE_URL = os.getenv("TOURNAMENT_SERVICE_URL", "http://tournament-service:8003")
     NOTIFICATION_SERVICE_URL = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:8004")
+
+    # Replicas per service (comma-separated); default to the single service URL
+    AUTH_SERVICE_URLS = _parse_list(os.getenv("AUTH_SERVICE_URLS", AUTH_SERVICE_URL))
+    USER_SERVICE_URLS = _parse_list(os.getenv("USER_SERVICE_URLS", USER_SERVICE_URL))
+    TOURNAMENT_SERVICE_URLS = _parse_list(os.getenv("TOURNAMENT_SERVICE_URLS", TOURNAMENT_SERVICE_URL))
+    NOTIFICATION_SERVICE_URLS = _parse_list(os.getenv("NOTIFICATION_SERVICE_URLS", NOTIFICATION_SERVICE_URL))
+
+    # Re-resolve replica hostnames every N seconds (0 disables), e.g. for a
+    # headless Kubernetes service that returns one A record per pod
+    UPSTREAM_DNS_REFRESH = float(os.getenv("UPSTREAM_DNS_REFRESH", "0"))
+    UPSTREAM_MAX_ENDPOINTS = int(os.getenv("UPSTREAM_MAX_ENDPOINTS", "32"))
+    UPSTREAM_LATENCY_EWMA_ALPHA = float(os.getenv("UPSTREAM_LATENCY_EWMA_ALPHA", "0.3"))
+
+    # Upstream connection pooling (keep-alive connections per service)
+    UPSTREAM_POOL_MAXSIZE = int(os.getenv("UPSTREAM_POOL_MAXSIZE", "50"))
+    UPSTREAM_POOL_BLOCK = os.getenv("UPSTREAM_POOL_BLOCK", "false").lower() == "true"
+
+    # Upstream timeouts in seconds; ROUTE_TIMEOUTS overrides them per route prefix
+    UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3"))
+    UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "30"))
+    ROUTE_TIMEOUTS = _parse_route_timeouts(
+        os.getenv("ROUTE_TIMEOUTS", "/api/auth=2:10,/api/users=2:10,/api/notifications=2:10")
+    )
+
+    # Stream request/response bodies through the gateway instead of buffering them
+    PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() == "true"
+    PROXY_CHUNK_SIZE = int(os.getenv("PROXY_CHUNK_SIZE", str(64 * 1024)))
+
+    # Gateway runtime: "flask" (threaded WSGI) or "asyncio" (aiohttp event loop)
+    GATEWAY_ENGINE = os.getenv("GATEWAY_ENGINE", "flask").lower()
+    ASYNC_UPSTREAM_LIMIT_PER_HOST = int(os.getenv("ASYNC_UPSTREAM_LIMIT_PER_HOST", "1000"))
+    ASYNC_KEEPALIVE_TIMEOUT = float(os.getenv("ASYNC_KEEPALIVE_TIMEOUT", "30"))
+
+    REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+    # Response cache for hot GET routes (see cache.CACHE_RULES)
+    CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "5000"))
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    CACHE_TTL_LEADERBOARD = float(os.getenv("CACHE_TTL_LEADERBOARD", "15"))
+    CACHE_TTL_TOURNAMENTS = float(os.getenv("CACHE_TTL_TOURNAMENTS", "10"))
+    CACHE_TTL_USER_ME = float(os.getenv("CACHE_TTL_USER_ME", "30"))
+    CACHE_TTL_BRACKET = float(os.getenv("CACHE_TTL_BRACKET", "5"))
+    # How long requests coalesced behind an identical in-flight GET wait for it
+    COALESCE_WAIT_TIMEOUT = float(os.getenv("COALESCE_WAIT_TIMEOUT", "30"))
+    CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache-invalidation")
+
+    # Edge JWT verification; verified claims are forwarded in HMAC-signed headers
+    EDGE_AUTH_ENABLED = os.getenv("EDGE_AUTH_ENABLED", "true").lower() == "true"
+    EDGE_AUTH_CACHE_SIZE = int(os.getenv("EDGE_AUTH_CACHE_SIZE", "10000"))
+    EDGE_AUTH_CACHE_TTL = float(os.getenv("EDGE_AUTH_CACHE_TTL", "300"))
+    INTERNAL_AUTH_SECRET = os.getenv("INTERNAL_AUTH_SECRET", "")
+
+    # Circuit breaking per replica: a replica is ejected when enough recent calls
+    # failed or were slower than BREAKER_SLOW_CALL_SECONDS
+    BREAKER_ENABLED = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+    BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_SLOW_CALL_SECONDS = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "5"))
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "10"))
+    BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+    # Hedged GETs: send a second attempt to another replica once the first has
+    # been outstanding longer than the upstream's recent p95 latency
+    HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+    HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+    HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", "32"))
+
+    # Admission control: priority-aware shedding and token-bucket rate limits
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_CLIENT_RATE = float(os.getenv("RATE_LIMIT_CLIENT_RATE", "20"))
+    RATE_LIMIT_CLIENT_BURST = float(os.getenv("RATE_LIMIT_CLIENT_BURST", "60"))
+    # Load balancers in front of the gateway; the client IP is taken from the
+    # X-Forwarded-For entry this many hops from the right (0 = the socket peer)
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+    RATE_LIMIT_LEADERBOARD_RATE = float(os.getenv("RATE_LIMIT_LEADERBOARD_RATE", "500"))
+    RATE_LIMIT_LEADERBOARD_BURST = float(os.getenv("RATE_LIMIT_LEADERBOARD_BURST", "1000"))
+    ADMISSION_INITIAL_LIMIT = int(os.getenv("ADMISSION_INITIAL_LIMIT", "100"))
+    ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", "10"))
+    ADMISSION_MAX_LIMIT = int(os.getenv("ADMISSION_MAX_LIMIT", "1000"))
+    ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))
+    ADMISSION_LATENCY_FLOOR = float(os.getenv("ADMISSION_LATENCY_FLOOR", "0.05"))
+    ADMISSION_BACKOFF_RATIO = float(os.getenv("ADMISSION_BACKOFF_RATIO", "0.9"))
+    ADMISSION_DECREASE_INTERVAL = float(os.getenv("ADMISSION_DECREASE_INTERVAL", "0.5"))
+    ADMISSION_NORMAL_SHARE = float(os.getenv("ADMISSION_NORMAL_SHARE", "0.8"))
+    ADMISSION_LOW_SHARE = float(os.getenv("ADMISSION_LOW_SHARE", "0.5"))
+
+    # Static assets are indexed into memory at startup; in development edited
+    # files are picked up on the next request
+    STATIC_AUTO_RELOAD = os.getenv("STATIC_AUTO_RELOAD", str(DEBUG)).lower() == "true"
+
+    # Negotiated gzip/brotli compression of proxied API responses. Streamed
+    # responses are only buffered for compression up to COMPRESSION_MAX_SIZE.
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_MAX_SIZE = int(os.getenv("COMPRESSION_MAX_SIZE", str(8 * 1024 * 1024)))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # /api/batch: GET sub-requests dispatched concurrently in one round trip
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+    BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "64"))
+
+    # Tracing: W3C traceparent and X-Request-ID propagation, spans exported as
+    # JSON lines to TRACE_EXPORT_PATH and/or POSTed to TRACE_COLLECTOR_URL
+    SERVICE_NAME = os.getenv("SERVICE_NAME", "api-gateway")
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+    TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+    TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
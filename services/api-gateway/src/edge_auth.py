@@ -0,0 +1,124 @@
+import base64
+import hashlib
+import hmac
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import ExpiredSignatureError, InvalidTokenError
+from .config import Config
+
+# Routes the services serve without a token; an invalid token is ignored there
+# rather than rejected at the edge
+PUBLIC_ROUTES = [
+    re.compile(r"^/api/auth/(register|login|sync-approval|sync-ban|health)$"),
+    re.compile(r"^/api/users/(create|health)$"),
+    re.compile(r"^/api/tournaments/(leaderboard|health)$"),
+    re.compile(r"^/api/notifications/"),
+]
+
+# Internal headers carrying claims the gateway has already verified
+CLAIMS_HEADER = "X-Verified-Claims"
+SIGNATURE_HEADER = "X-Verified-Signature"
+
+
+class TokenCache:
+    """Small LRU of decoded tokens keyed by token hash"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token_hash):
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return claims
+
+    def set(self, token_hash, claims):
+        # Never keep a token around longer than it is valid
+        expires_at = time.time() + Config.EDGE_AUTH_CACHE_TTL
+        if claims.get("exp"):
+            expires_at = min(expires_at, claims["exp"])
+        with self._lock:
+            self._entries[token_hash] = (claims, expires_at)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache(Config.EDGE_AUTH_CACHE_SIZE)
+
+
+def is_public_route(path):
+    return any(pattern.match(path) for pattern in PUBLIC_ROUTES)
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def verify_request_token(path, authorization):
+    """Verify the bearer token once at the edge
+
+    Returns (claims, error_response). Both are None when the request carries
+    no token or the route is public and the token did not verify.
+    """
+    if not Config.EDGE_AUTH_ENABLED or not authorization:
+        return None, None
+
+    parts = authorization.split()
+    if len(parts) != 2 or parts[0] != "Bearer":
+        if is_public_route(path):
+            return None, None
+        return None, ({"msg": "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"}, 401)
+
+    token_hash = hash_token(parts[1])
+    claims = token_cache.get(token_hash)
+    if claims is not None:
+        return claims, None
+
+    # Same responses flask_jwt_extended gives downstream, one hop earlier
+    try:
+        claims = decode_token(parts[1])
+    except ExpiredSignatureError:
+        error = ({"msg": "Token has expired"}, 401)
+    except (InvalidTokenError, JWTExtendedException) as e:
+        # e.g. a correctly signed token missing a required claim
+        error = ({"msg": str(e)}, 422)
+    else:
+        if claims.get("type") != "access":
+            error = ({"msg": "Only non-refresh tokens are allowed"}, 422)
+        else:
+            token_cache.set(token_hash, claims)
+            return claims, None
+
+    if is_public_route(path):
+        return None, None
+    return None, error
+
+
+def sign_claims(claims):
+    """Encode verified claims as internal headers the services can trust"""
+    value = base64.urlsafe_b64encode(json.dumps(claims, separators=(",", ":")).encode()).decode()
+    signature = hmac.new(Config.INTERNAL_AUTH_SECRET.encode(), value.encode(), hashlib.sha256).hexdigest()
+    return {CLAIMS_HEADER: value, SIGNATURE_HEADER: signature}
+
+
+def get_user_scope(claims, authorization):
+    """Identify the caller for per-user cache keys"""
+    if claims:
+        return "user:" + str(claims.get("sub"))
+    if authorization:
+        return "token:" + hash_token(authorization)
+    return "anonymous"
@@ -1,6 +1,18 @@
 from flask import request, Response
+import math
 import requests
 from .config import Config
+from .upstream import get_upstream, call_upstream, CircuitOpenError
+from .edge_auth import (
+    CLAIMS_HEADER, SIGNATURE_HEADER, verify_request_token, sign_claims, get_user_scope,
+)
+from .admission import classify, check_rate_limits
+from .cache import (
+    CachedResponse, response_cache, get_cache_rule, get_cache_key, invalidate_for_write,
+)
+from .compression import negotiate_encoding, is_compressible, compress_response
+from .coalesce import single_flight
+from .tracing import TRACEPARENT_HEADER, REQUEST_ID_HEADER, outgoing_headers
 
 # Service routing configuration
 SERVICE_ROUTES = {
@@ -17,42 +29,240 @@ def get_target_service(path):
             return service_url, path
     return None, path
 
+# Hop-by-hop headers must not be forwarded; connection reuse is managed per
+# hop. Body framing is too: the upstream client derives Content-Length or
+# chunking from the body it actually sends.
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailers', 'transfer-encoding', 'upgrade', 'host', 'content-length',
+}
+
+def has_ambiguous_framing(headers):
+    """Both Content-Length and Transfer-Encoding: a classic request smuggling vector"""
+    return "Content-Length" in headers and "Transfer-Encoding" in headers
+
+# Internal headers only the gateway may set; client-supplied copies are dropped
+INTERNAL_HEADERS = {CLAIMS_HEADER.lower(), SIGNATURE_HEADER.lower()}
+
+# Replaced by the gateway's own trace context when the request is traced
+TRACE_HEADERS = {TRACEPARENT_HEADER.lower(), REQUEST_ID_HEADER.lower()}
+
+class RequestBodyStream:
+    """File-like view of the client body so requests streams it with a Content-Length"""
+
+    def __init__(self, stream, length, chunk_size):
+        self.stream = stream
+        self.length = length
+        self.chunk_size = chunk_size
+
+    def __len__(self):
+        return self.length
+
+    def read(self, size=-1):
+        return self.stream.read(size)
+
+    def __iter__(self):
+        return iter_stream(self.stream, self.chunk_size)
+
+def iter_stream(stream, chunk_size):
+    """Yield a readable stream in bounded chunks"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+def get_request_body():
+    """Return the client body in a form that can be forwarded upstream"""
+    if not Config.PROXY_STREAMING:
+        return request.get_data()
+
+    if request.content_length is not None:
+        if request.content_length == 0:
+            return None
+        return RequestBodyStream(request.stream, request.content_length, Config.PROXY_CHUNK_SIZE)
+
+    # Chunked upload: forward it chunked as well
+    if request.headers.get("Transfer-Encoding", "").lower() == "chunked":
+        return iter_stream(request.stream, Config.PROXY_CHUNK_SIZE)
+    return None
+
+def iter_upstream(response, chunk_size, on_close):
+    """Relay the raw upstream body and release the connection afterwards"""
+    try:
+        for chunk in response.raw.stream(chunk_size, decode_content=False):
+            yield chunk
+    finally:
+        response.close()
+        on_close()
+
+def build_upstream_request(claims=None):
+    """Capture what is forwarded upstream so it can be sent from any thread"""
+    trace_headers = outgoing_headers()
+    headers = {
+        key: value for key, value in request.headers
+        if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() not in INTERNAL_HEADERS
+        and not (trace_headers and key.lower() in TRACE_HEADERS)
+    }
+    headers.update(trace_headers)
+    if claims and Config.INTERNAL_AUTH_SECRET:
+        headers.update(sign_claims(claims))
+    return {
+        "method": request.method,
+        "headers": headers,
+        "data": get_request_body(),
+        "params": list(request.args.items(multi=True)),
+    }
+
+def streamed_response(response, on_close):
+    """Relay an upstream response to the client chunk by chunk"""
+    # The body is relayed undecoded, so encoding and length stay valid
+    excluded_headers = ['transfer-encoding', 'connection']
+    response_headers = [
+        (name, value) for name, value in response.headers.items()
+        if name.lower() not in excluded_headers
+    ]
+    return Response(
+        iter_upstream(response, Config.PROXY_CHUNK_SIZE, on_close),
+        response.status_code,
+        response_headers,
+        direct_passthrough=True,
+    )
+
+def buffered_response(response):
+    """Read a whole upstream response into (status, headers, body)"""
+    # requests decodes the body, so the upstream encoding and length no longer apply
+    excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
+    response_headers = [
+        (name, value) for name, value in response.headers.items()
+        if name.lower() not in excluded_headers
+    ]
+    return response.status_code, response_headers, response.content
+
+def is_cacheable(status, headers):
+    """Only plain successful responses are stored"""
+    if status != 200:
+        return False
+    for name, value in headers:
+        lowered = name.lower()
+        if lowered == 'set-cookie':
+            return False
+        if lowered == 'cache-control' and ('no-store' in value or 'private' in value):
+            return False
+    return True
+
+def wants_compression(response):
+    """Whether a streamed response is small enough to buffer and compress for this client"""
+    length = response.headers.get("Content-Length", "")
+    if request.method == "HEAD" or not length.isdigit():
+        return False
+    if negotiate_encoding(request.headers.get("Accept-Encoding")) is None:
+        return False
+    return is_compressible(response.status_code, list(response.headers.items()), int(length))
+
+def get_client_id(claims):
+    """Identify the caller for rate limiting: the user if known, else the client IP
+
+    X-Forwarded-For is client-controlled, so only the hops added by trusted
+    proxies count; ProxyFix (TRUSTED_PROXY_HOPS) folds those into remote_addr.
+    """
+    if claims and claims.get("sub"):
+        return f"user:{claims['sub']}"
+    return f"ip:{request.remote_addr}"
+
+def send_upstream(upstream, path, claims, priority, stream):
+    """Admit and send the request; returns ((endpoint, response), error_response)"""
+    # Shed lower-priority traffic first once the upstream nears its limit
+    if Config.ADMISSION_ENABLED and not upstream.admits(priority):
+        return None, ({"error": "Service overloaded, try again shortly"}, 503, {"Retry-After": "1"})
+
+    try:
+        return call_upstream(upstream, path, build_upstream_request(claims), stream), None
+    except CircuitOpenError as e:
+        # Fail fast while every replica is ejected instead of waiting on timeouts
+        return None, ({"error": "Service unavailable: circuit open"}, 503, {"Retry-After": str(math.ceil(e.retry_after))})
+    except requests.exceptions.RequestException as e:
+        return None, ({"error": f"Service unavailable: {str(e)}"}, 503)
+
+def fetch_cacheable(upstream, path, claims, priority, cache_rule, cache_key):
+    """Fetch a cacheable GET and store it; returns (CachedResponse, error_response)"""
+    sent, error = send_upstream(upstream, path, claims, priority, stream=False)
+    if error:
+        return None, error
+    endpoint, response = sent
+    try:
+        status, response_headers, body = buffered_response(response)
+    except requests.exceptions.RequestException as e:
+        return None, ({"error": f"Service unavailable: {str(e)}"}, 503)
+    finally:
+        upstream.release(endpoint)
+
+    entry = CachedResponse(status, response_headers, body, cache_rule["ttl"], cache_rule["tags"])
+    if is_cacheable(status, response_headers):
+        response_cache.set(cache_key, entry)
+    return entry, None
+
 def proxy_request(service_url, path):
     """Proxy the request to the target service"""
     if not service_url:
         return {"error": "Service not found"}, 404
-    
-    # Build target URL
-    target_url = f"{service_url}{path}"
-    
-    # Get request data
-    headers = {key: value for key, value in request.headers if key.lower() != 'host'}
-    data = request.get_data()
-    params = request.args
-    
-    try:
-        # Forward the request
-        response = requests.request(
-            method=request.method,
-            url=target_url,
-            headers=headers,
-            data=data,
-            params=params,
-            allow_redirects=False,
-            timeout=30
-        )
-        
-        # Build response
-        excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
-        response_headers = [
-            (name, value) for name, value in response.headers.items()
-            if name.lower() not in excluded_headers
-        ]
-        
-        return Response(
-            response.content,
-            response.status_code,
-            response_headers
+    if has_ambiguous_framing(request.headers):
+        return {"error": "Content-Length and Transfer-Encoding must not both be set"}, 400
+
+    # Reject bad tokens here instead of after a proxy hop
+    authorization = request.headers.get("Authorization")
+    claims, error = verify_request_token(path, authorization)
+    if error:
+        return error
+
+    # Token buckets per client and per route, shared across gateway replicas
+    priority, route_bucket = classify(request.method, path)
+    if Config.ADMISSION_ENABLED and not check_rate_limits(get_client_id(claims), route_bucket):
+        return {"error": "Too many requests"}, 429, {"Retry-After": "1"}
+
+    accept_encoding = request.headers.get("Accept-Encoding")
+    upstream = get_upstream(service_url)
+
+    # Serve hot GET routes from the response cache when possible
+    cache_rule = get_cache_rule(request.method, path)
+    if cache_rule:
+        cache_key = get_cache_key(
+            cache_rule, path, request.query_string.decode(), get_user_scope(claims, authorization), bool(claims)
         )
+        entry = response_cache.get(cache_key)
+        cache_status = "HIT"
+        if entry is None:
+            # Identical concurrent misses wait for one upstream call and share its response
+            try:
+                (entry, error), shared = single_flight.do(
+                    cache_key, lambda: fetch_cacheable(upstream, path, claims, priority, cache_rule, cache_key)
+                )
+            except TimeoutError:
+                return {"error": "Upstream request timed out"}, 504
+            if error:
+                return error
+            cache_status = "COALESCED" if shared else "MISS"
+        # Compress through the entry so every waiter and later hits reuse the result
+        headers, body = compress_response(entry.status, entry.headers, entry.body, accept_encoding, entry.encoded)
+        return Response(body, entry.status, headers + [("X-Cache", cache_status)])
+
+    sent, error = send_upstream(upstream, path, claims, priority, Config.PROXY_STREAMING)
+    if error:
+        return error
+    endpoint, response = sent
+
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        invalidate_for_write(path)
+
+    if Config.PROXY_STREAMING and not wants_compression(response):
+        # The replica stays busy until the client has read the whole body
+        return streamed_response(response, lambda: upstream.release(endpoint))
+
+    try:
+        status, response_headers, body = buffered_response(response)
     except requests.exceptions.RequestException as e:
         return {"error": f"Service unavailable: {str(e)}"}, 503
+    finally:
+        upstream.release(endpoint)
+    response_headers, body = compress_response(status, response_headers, body, accept_encoding)
+    return Response(body, status, response_headers)
@@ -0,0 +1,82 @@
+import os
+import re
+import time
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+# Latency buckets in seconds, spanning cache hits to slow reports
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to produce an HTTP response", ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", multiprocess_mode="livesum"
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to other services", ["target", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Proxied paths are labelled by their shape, e.g. /api/tournaments/<id>/bracket
+PROXIED_PATH = re.compile(r"^/api/(auth|users|tournaments|notifications)(/|$)")
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def get_route_label(status):
+    """Route label with ids collapsed; unknown paths share one series"""
+    if status == 404:
+        # Keep arbitrary client paths from creating new series
+        return "unmatched"
+    if PROXIED_PATH.match(request.path):
+        return ID_SEGMENT.sub("/<id>", request.path.rstrip("/") or "/")
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def get_registry():
+    """Under a pre-fork server every worker writes its own files; sum them on scrape"""
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def observe_upstream(target, method, status, duration):
+    UPSTREAM_LATENCY.labels(target, method, status).observe(duration)
+
+
+def init_metrics(app):
+    """Record per-route request metrics and serve them on /metrics"""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(error=None):
+        # Streamed responses are timed to the first byte
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        REQUESTS_IN_FLIGHT.dec()
+        status = g.pop("metrics_status", 500)
+        route = get_route_label(status)
+        REQUEST_COUNT.labels(request.method, route, str(status)).inc()
+        REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(generate_latest(get_registry()), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,221 @@
+import copy
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+from email.utils import formatdate
+from .config import Config
+from .compression import COMPRESSIBLE_TYPES, negotiate_encoding
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip variants are always built
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Local src/href references in HTML pages; URLs with a scheme, query or
+# fragment are left alone
+ASSET_REFERENCE = re.compile(r'\b(src|href)="([^"?#:$]+)"')
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+class StaticAsset:
+    """A static file held in memory with its precompressed variants"""
+
+    def __init__(self, path, body, mtime, immutable=False, prebuilt_variants=True):
+        self.path = path
+        self.body = body
+        self.mtime = mtime
+        self.immutable = immutable
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.mimetype = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.mimetype.startswith("text/") or self.mimetype == "application/javascript":
+            self.mimetype += "; charset=utf-8"
+        self.last_modified = formatdate(mtime, usegmt=True)
+        self.variants = {}
+        if COMPRESSIBLE_TYPES.match(self.mimetype):
+            self._build_variants(prebuilt_variants)
+
+    def etag(self, encoding=None):
+        """Strong ETag per representation, since each encoding has different bytes"""
+        tag = self.digest[:32]
+        return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+    def fingerprinted_name(self, name):
+        """Name of the immutable alias for this asset, e.g. js/auth.1a2b3c4d.js"""
+        root, ext = os.path.splitext(name)
+        return f"{root}.{self.digest[:8]}{ext}"
+
+    def as_immutable(self):
+        """Copy of this asset served with long-lived immutable caching"""
+        alias = copy.copy(self)
+        alias.immutable = True
+        return alias
+
+    def with_body(self, body):
+        """Copy of this asset with a rewritten body, compressed afresh"""
+        return StaticAsset(self.path, body, self.mtime, prebuilt_variants=False)
+
+    def _build_variants(self, prebuilt):
+        # Prefer variants shipped next to the file (e.g. from a build step)
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if prebuilt and os.path.isfile(self.path + suffix):
+                with open(self.path + suffix, "rb") as f:
+                    self.variants[encoding] = f.read()
+
+        if "gzip" not in self.variants:
+            self.variants["gzip"] = gzip.compress(self.body, compresslevel=9, mtime=0)
+        if "br" not in self.variants and brotli is not None:
+            self.variants["br"] = brotli.compress(self.body, quality=11)
+
+        # Drop variants that do not pay for themselves
+        for encoding in list(self.variants):
+            if len(self.variants[encoding]) >= len(self.body):
+                del self.variants[encoding]
+
+
+class StaticManifest:
+    """In-memory index of the static directory, built once at startup"""
+
+    def __init__(self, static_dir, auto_reload=False):
+        self.static_dir = static_dir
+        self.auto_reload = auto_reload
+        self.assets = {}
+        self._lock = threading.Lock()
+        self.build()
+
+    def build(self):
+        assets = {}
+        if os.path.isdir(self.static_dir):
+            for root, _, files in os.walk(self.static_dir):
+                for filename in files:
+                    if filename.endswith((".gz", ".br")):
+                        continue
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, self.static_dir).replace(os.sep, "/")
+                    asset = self._load(path, name)
+                    if asset is not None:
+                        assets[name] = asset
+
+        # Pages are entry points and always revalidate; what they load is
+        # served under content-hashed names that can be cached for good.
+        # Reloaded files would change under their old hash, so development
+        # setups keep the plain names.
+        if not self.auto_reload:
+            aliases = {
+                name: asset.fingerprinted_name(name)
+                for name, asset in assets.items() if not name.endswith(".html")
+            }
+            for name, alias in aliases.items():
+                assets[alias] = assets[name].as_immutable()
+            for name, asset in list(assets.items()):
+                if name.endswith(".html"):
+                    assets[name] = self._fingerprint_references(name, asset, aliases)
+        with self._lock:
+            self.assets = assets
+        logger.info(f"Indexed {len(assets)} static assets from {self.static_dir}")
+
+    def lookup(self, name):
+        """Find the asset for a URL path, trying the .html fallback for bare names"""
+        candidates = [name]
+        if "." not in name.rsplit("/", 1)[-1]:
+            candidates.append(f"{name}.html")
+
+        for candidate in candidates:
+            asset = self.assets.get(candidate)
+            if self.auto_reload:
+                asset = self._reload_if_changed(candidate, asset)
+            if asset is not None:
+                return asset
+        return None
+
+    def _fingerprint_references(self, name, page, aliases):
+        """Point the page's references to local assets at their hashed aliases"""
+        text = page.body.decode("utf-8", errors="surrogateescape")
+        base = posixpath.dirname(name)
+
+        def replace(match):
+            attribute, reference = match.groups()
+            if reference.startswith("/"):
+                target = reference.lstrip("/")
+            else:
+                target = posixpath.normpath(posixpath.join(base, reference))
+            alias = aliases.get(target)
+            return f'{attribute}="/{alias}"' if alias else match.group(0)
+
+        rewritten = ASSET_REFERENCE.sub(replace, text).encode("utf-8", errors="surrogateescape")
+        return page if rewritten == page.body else page.with_body(rewritten)
+
+    def _load(self, path, name):
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+            mtime = os.path.getmtime(path)
+        except OSError as e:
+            logger.warning(f"Could not index static file {path}: {e}")
+            return None
+        return StaticAsset(path, body, mtime)
+
+    def _reload_if_changed(self, name, asset):
+        """Development helper: pick up edits without restarting the gateway"""
+        path = os.path.realpath(os.path.join(self.static_dir, name))
+        if not path.startswith(os.path.realpath(self.static_dir) + os.sep) or not os.path.isfile(path):
+            return asset if asset is not None and os.path.isfile(asset.path) else None
+        if asset is not None and os.path.getmtime(path) == asset.mtime:
+            return asset
+        asset = self._load(path, name)
+        if asset is not None:
+            with self._lock:
+                self.assets[name] = asset
+        return asset
+
+
+def choose_encoding(asset, accept_encoding):
+    """Pick the best precompressed variant the client accepts"""
+    return negotiate_encoding(accept_encoding, asset.variants)
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def serve_asset(asset, accept_encoding, if_none_match):
+    """Build (status, headers, body) for an asset without touching disk"""
+    encoding = choose_encoding(asset, accept_encoding)
+    etag = asset.etag(encoding)
+    headers = [
+        ("ETag", etag),
+        ("Cache-Control", IMMUTABLE_CACHE_CONTROL if asset.immutable else REVALIDATE_CACHE_CONTROL),
+        ("Last-Modified", asset.last_modified),
+        ("Vary", "Accept-Encoding"),
+    ]
+    if etag_matches(if_none_match, etag):
+        return 304, headers, b""
+
+    body = asset.variants[encoding] if encoding else asset.body
+    headers.append(("Content-Type", asset.mimetype))
+    if encoding:
+        headers.append(("Content-Encoding", encoding))
+    return 200, headers, body
+
+
+def create_manifest(static_dir):
+    """Index the static directory; development setups reload edited files"""
+    return StaticManifest(static_dir, auto_reload=Config.STATIC_AUTO_RELOAD)
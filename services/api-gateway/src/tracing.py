@@ -0,0 +1,227 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, request
+import requests
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# W3C trace context: version-traceid-parentid-flags
+TRACEPARENT_HEADER = "traceparent"
+REQUEST_ID_HEADER = "X-Request-ID"
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _new_id(length):
+    return f"{random.getrandbits(length * 4):0{length}x}"
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    def __init__(self, name, kind, trace_id, parent_id, sampled, request_id, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(16)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.request_id = request_id
+        self.attributes = dict(attributes or {})
+        self.status = "ok"
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_error(self, message):
+        self.status = "error"
+        self.attributes["error"] = message
+
+    def end(self):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        if self.sampled:
+            exporter.export(self)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "request_id": self.request_id,
+            "service": Config.SERVICE_NAME,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Ships finished spans to a JSONL file and/or a collector from a background thread"""
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=Config.TRACE_QUEUE_SIZE)
+        self._pid = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def export(self, span):
+        if not Config.TRACE_EXPORT_PATH and not Config.TRACE_COLLECTOR_URL:
+            return
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span.to_dict())
+        except queue.Full:
+            # Never slow a request down to keep a span
+            self.dropped += 1
+
+    def _ensure_worker(self):
+        # Started lazily once per process so pre-forked workers each get one
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        if Config.TRACE_EXPORT_PATH:
+            try:
+                with open(Config.TRACE_EXPORT_PATH, "a") as f:
+                    for span in batch:
+                        f.write(json.dumps(span) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write spans to {Config.TRACE_EXPORT_PATH}: {e}")
+        if Config.TRACE_COLLECTOR_URL:
+            try:
+                # Plain requests on purpose: exporting must not create spans itself
+                requests.post(Config.TRACE_COLLECTOR_URL, json={"spans": batch}, timeout=2)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Could not send spans to collector: {e}")
+
+
+exporter = SpanExporter()
+
+
+def parse_traceparent(value):
+    """Return (trace_id, parent_span_id, sampled) or None for a missing or invalid header"""
+    match = TRACEPARENT_PATTERN.match((value or "").strip().lower())
+    if not match or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), int(match.group(3), 16) & 1 == 1
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name, kind="internal", parent=None, **attributes):
+    """Time a block as a child of the current span (or of an explicit parent)"""
+    parent = parent or _current_span.get()
+    if parent is None or not Config.TRACING_ENABLED:
+        # Outside a traced request there is nothing to attach the span to
+        yield None
+        return
+    span = Span(name, kind, parent.trace_id, parent.span_id, parent.sampled, parent.request_id, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.set_error(str(e))
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def parent_from_headers(headers):
+    """The caller's span as described by trace headers, for work started on other threads"""
+    values = {key.lower(): value for key, value in headers.items()}
+    incoming = parse_traceparent(values.get(TRACEPARENT_HEADER))
+    if not incoming:
+        return None
+    trace_id, span_id, sampled = incoming
+    parent = Span("remote", "server", trace_id, None, sampled, values.get(REQUEST_ID_HEADER.lower()) or trace_id)
+    parent.span_id = span_id
+    return parent
+
+
+def outgoing_headers(span=None):
+    """Headers that carry the trace and request ID to the next hop"""
+    span = span or _current_span.get()
+    if span is None:
+        return {}
+    return {TRACEPARENT_HEADER: span.traceparent, REQUEST_ID_HEADER: span.request_id}
+
+
+def init_tracing(app):
+    """Continue the caller's trace for every request and echo its request ID"""
+
+    @app.before_request
+    def start_request_span():
+        if not Config.TRACING_ENABLED:
+            return
+        incoming = parse_traceparent(request.headers.get(TRACEPARENT_HEADER))
+        if incoming:
+            trace_id, parent_id, sampled = incoming
+        else:
+            trace_id, parent_id, sampled = _new_id(32), None, random.random() < Config.TRACE_SAMPLE_RATE
+        request_id = request.headers.get(REQUEST_ID_HEADER) or trace_id
+        span = Span(
+            f"{request.method} {request.path}",
+            "server", trace_id, parent_id, sampled, request_id,
+            {"http.method": request.method, "http.target": request.full_path.rstrip("?")},
+        )
+        g.trace_span = span
+        _current_span.set(span)
+
+    @app.after_request
+    def add_trace_headers(response):
+        span = g.get("trace_span")
+        if span is not None:
+            span.attributes["http.status_code"] = response.status_code
+            if response.status_code >= 500:
+                span.status = "error"
+            response.headers[REQUEST_ID_HEADER] = span.request_id
+            response.headers[TRACEPARENT_HEADER] = span.traceparent
+        return response
+
+    @app.teardown_request
+    def end_request_span(error=None):
+        span = g.pop("trace_span", None)
+        if span is None:
+            return
+        if error is not None:
+            span.set_error(str(error))
+        _current_span.set(None)
+        span.end()
@@ -0,0 +1,441 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
+from functools import partial
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from .config import Config
+from .admission import AdaptiveLimit
+from .metrics import observe_upstream
+from .tracing import start_span, parent_from_headers, outgoing_headers
+
+logger = logging.getLogger(__name__)
+
+# Replica URLs behind each logical service URL used in SERVICE_ROUTES
+UPSTREAM_ENDPOINTS = {
+    Config.AUTH_SERVICE_URL: Config.AUTH_SERVICE_URLS,
+    Config.USER_SERVICE_URL: Config.USER_SERVICE_URLS,
+    Config.TOURNAMENT_SERVICE_URL: Config.TOURNAMENT_SERVICE_URLS,
+    Config.NOTIFICATION_SERVICE_URL: Config.NOTIFICATION_SERVICE_URLS,
+}
+
+# One pooled session per upstream service, created on first use
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(service_url):
+    """Return the keep-alive session for an upstream service"""
+    session = _sessions.get(service_url)
+    if session is not None:
+        return session
+
+    with _sessions_lock:
+        session = _sessions.get(service_url)
+        if session is None:
+            session = requests.Session()
+            # Never pick up proxy settings from the environment for internal calls
+            session.trust_env = False
+            adapter = HTTPAdapter(
+                # One connection pool per replica host
+                pool_connections=Config.UPSTREAM_MAX_ENDPOINTS,
+                pool_maxsize=Config.UPSTREAM_POOL_MAXSIZE,
+                pool_block=Config.UPSTREAM_POOL_BLOCK,
+                max_retries=0,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[service_url] = session
+    return session
+
+
+def get_timeout(path):
+    """Return the (connect, read) timeout for a request path"""
+    best_prefix = None
+    for prefix in Config.ROUTE_TIMEOUTS:
+        if path.startswith(prefix) and (best_prefix is None or len(prefix) > len(best_prefix)):
+            best_prefix = prefix
+    if best_prefix is not None:
+        return Config.ROUTE_TIMEOUTS[best_prefix]
+    return (Config.UPSTREAM_CONNECT_TIMEOUT, Config.UPSTREAM_READ_TIMEOUT)
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a rolling window of recent calls"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self):
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=Config.BREAKER_WINDOW)
+        self.opened_at = 0.0
+        self.probes = 0
+
+    def available(self):
+        """Whether a request may be sent through this breaker right now"""
+        if not Config.BREAKER_ENABLED or self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at >= Config.BREAKER_OPEN_SECONDS
+        return self.probes < Config.BREAKER_HALF_OPEN_PROBES
+
+    def on_acquire(self):
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+            self.probes = 0
+        if self.state == self.HALF_OPEN:
+            self.probes += 1
+
+    def record(self, failed):
+        if self.state == self.HALF_OPEN:
+            # A probe decides alone: close on success, reopen on failure
+            if failed:
+                self._open()
+            else:
+                self.state = self.CLOSED
+                self.outcomes.clear()
+            return
+        if self.state == self.OPEN:
+            return
+
+        self.outcomes.append(failed)
+        if len(self.outcomes) >= Config.BREAKER_MIN_CALLS:
+            failure_rate = sum(self.outcomes) / len(self.outcomes)
+            if failure_rate >= Config.BREAKER_FAILURE_RATE:
+                self._open()
+
+    def retry_after(self):
+        """Seconds until the breaker lets a probe through"""
+        return max(0.0, Config.BREAKER_OPEN_SECONDS - (time.monotonic() - self.opened_at))
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+        self.probes = 0
+
+
+class Endpoint:
+    """One replica of an upstream service with its live load figures"""
+
+    def __init__(self, url):
+        self.url = url
+        self.in_flight = 0
+        self.latency = None  # EWMA of time to response headers, in seconds
+        self.requests = 0
+        self.errors = 0
+        self.breaker = CircuitBreaker()
+
+    def observe(self, latency, failed=False):
+        """Record the outcome of a call; slow calls count against the breaker"""
+        self.requests += 1
+        self.breaker.record(failed or latency >= Config.BREAKER_SLOW_CALL_SECONDS)
+        if failed:
+            self.errors += 1
+            return
+        if self.latency is None:
+            self.latency = latency
+        else:
+            alpha = Config.UPSTREAM_LATENCY_EWMA_ALPHA
+            self.latency = alpha * latency + (1 - alpha) * self.latency
+
+    def load(self):
+        """Ordering key for balancing: fewest outstanding requests, then fastest"""
+        return (self.in_flight, self.latency if self.latency is not None else 0.0)
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency * 1000, 2) if self.latency is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "breaker": self.breaker.state,
+        }
+
+
+class Upstream:
+    """The replicas of one service and the policy for choosing between them"""
+
+    def __init__(self, service_url, seed_urls):
+        self.service_url = service_url
+        # Metrics label: the logical service, not the replica that answered
+        self.target = urlsplit(service_url).netloc
+        self.seed_urls = seed_urls
+        self.endpoints = [Endpoint(url) for url in seed_urls]
+        self.resolved_at = 0.0
+        self.latencies = deque(maxlen=200)
+        self.concurrency = AdaptiveLimit()
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude=None):
+        """Pick a replica by power-of-two-choices on outstanding requests
+
+        Replicas whose breaker is open are skipped; returns None when no
+        replica may take the request.
+        """
+        with self._lock:
+            endpoints = [
+                endpoint for endpoint in self.endpoints
+                if endpoint is not exclude and endpoint.breaker.available()
+            ]
+            if not endpoints:
+                return None
+            if len(endpoints) == 1:
+                endpoint = endpoints[0]
+            else:
+                first, second = random.sample(endpoints, 2)
+                endpoint = first if first.load() <= second.load() else second
+            endpoint.breaker.on_acquire()
+            endpoint.in_flight += 1
+            return endpoint
+
+    def release(self, endpoint):
+        with self._lock:
+            endpoint.in_flight -= 1
+
+    def observe(self, endpoint, latency, failed=False):
+        """Record a call outcome on the replica and in the upstream's latency sample"""
+        with self._lock:
+            endpoint.observe(latency, failed)
+            if not failed:
+                self.latencies.append(latency)
+        self.concurrency.update(latency, failed)
+
+    def admits(self, priority):
+        """Whether the adaptive concurrency limit has room for this priority"""
+        in_flight = sum(endpoint.in_flight for endpoint in self.endpoints)
+        return self.concurrency.admits(in_flight, priority)
+
+    def retry_after(self):
+        """Seconds until any ejected replica may be probed again"""
+        return min((e.breaker.retry_after() for e in self.endpoints), default=0.0)
+
+    def hedge_delay(self):
+        """Recent p95 latency, or None until there are enough samples"""
+        samples = sorted(self.latencies)
+        if len(samples) < Config.HEDGE_MIN_SAMPLES:
+            return None
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return max(p95, Config.HEDGE_MIN_DELAY)
+
+    def resolve(self):
+        """Re-resolve seed hostnames so every replica address becomes an endpoint"""
+        urls = []
+        for seed_url in self.seed_urls:
+            parts = urlsplit(seed_url)
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+            try:
+                infos = socket.getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+            except socket.gaierror as e:
+                logger.warning(f"Could not resolve {parts.hostname}: {e}")
+                continue
+            for address in sorted({info[4][0] for info in infos}):
+                host = f"[{address}]" if ":" in address else address
+                urls.append(f"{parts.scheme}://{host}:{port}")
+
+        if not urls:
+            # Keep the previous endpoints rather than routing nowhere
+            return
+
+        with self._lock:
+            existing = {endpoint.url: endpoint for endpoint in self.endpoints}
+            self.endpoints = [existing.get(url) or Endpoint(url) for url in urls[:Config.UPSTREAM_MAX_ENDPOINTS]]
+            self.resolved_at = time.monotonic()
+
+    def stats(self):
+        return {
+            "requests": sum(e.requests for e in self.endpoints),
+            "errors": sum(e.errors for e in self.endpoints),
+            "endpoints": [e.stats() for e in self.endpoints],
+            "concurrency": self.concurrency.stats(),
+        }
+
+
+_upstreams = {
+    service_url: Upstream(service_url, seed_urls)
+    for service_url, seed_urls in UPSTREAM_ENDPOINTS.items()
+}
+
+
+def get_upstream(service_url):
+    """Return the replica set for a logical service URL"""
+    ensure_resolver()
+    upstream = _upstreams.get(service_url)
+    if upstream is None:
+        upstream = _upstreams.setdefault(service_url, Upstream(service_url, [service_url]))
+    return upstream
+
+
+# DNS re-resolution thread, started lazily once per process so that
+# pre-forked workers each get their own
+_resolver_pid = None
+_resolver_lock = threading.Lock()
+
+
+def ensure_resolver():
+    global _resolver_pid
+    if Config.UPSTREAM_DNS_REFRESH <= 0 or _resolver_pid == os.getpid():
+        return
+    with _resolver_lock:
+        if _resolver_pid == os.getpid():
+            return
+        _resolver_pid = os.getpid()
+        thread = threading.Thread(target=_resolve_periodically, daemon=True)
+        thread.start()
+
+
+def _resolve_periodically():
+    while True:
+        for upstream in list(_upstreams.values()):
+            try:
+                upstream.resolve()
+            except Exception as e:
+                logger.warning(f"Endpoint refresh failed for {upstream.service_url}: {e}")
+        time.sleep(Config.UPSTREAM_DNS_REFRESH)
+
+
+class CircuitOpenError(Exception):
+    """Raised when every replica of an upstream is ejected"""
+
+    def __init__(self, retry_after):
+        super().__init__("circuit open")
+        self.retry_after = retry_after
+
+
+def send(upstream, endpoint, path, upstream_request, stream):
+    """Send one attempt to a replica and record its outcome
+
+    The replica stays acquired on success; the caller releases it once the
+    response has been consumed.
+    """
+    # Attempts may run on hedge threads, so the parent span travels in the headers
+    parent = parent_from_headers(upstream_request["headers"])
+    with start_span(
+        f"{upstream_request['method']} {upstream.target}", "client", parent=parent,
+        **{"http.url": f"{endpoint.url}{path}"},
+    ) as span:
+        attempt = dict(upstream_request, headers={**upstream_request["headers"], **outgoing_headers(span)})
+        started = time.monotonic()
+        try:
+            response = get_session(upstream.service_url).request(
+                url=f"{endpoint.url}{path}",
+                allow_redirects=False,
+                timeout=get_timeout(path),
+                stream=stream,
+                **attempt,
+            )
+        except requests.exceptions.RequestException:
+            latency = time.monotonic() - started
+            upstream.observe(endpoint, latency, failed=True)
+            observe_upstream(upstream.target, upstream_request["method"], "error", latency)
+            upstream.release(endpoint)
+            raise
+        latency = time.monotonic() - started
+        upstream.observe(endpoint, latency, failed=response.status_code >= 500)
+        observe_upstream(upstream.target, upstream_request["method"], str(response.status_code), latency)
+        if span is not None:
+            span.attributes["http.status_code"] = response.status_code
+        return response
+
+
+# Threads for hedged attempts, created lazily once per process
+_hedge_executor = None
+_hedge_pid = None
+
+
+def get_hedge_executor():
+    global _hedge_executor, _hedge_pid
+    if _hedge_pid != os.getpid():
+        _hedge_executor = ThreadPoolExecutor(max_workers=Config.HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+        _hedge_pid = os.getpid()
+    return _hedge_executor
+
+
+def _discard(upstream, endpoint, future):
+    """Close the losing attempt of a hedged request once it completes"""
+    if future.exception() is None:
+        future.result().close()
+        upstream.release(endpoint)
+
+
+def call_upstream(upstream, path, upstream_request, stream):
+    """Send a request to the best replica, hedging idempotent GETs
+
+    Returns (endpoint, response). Raises CircuitOpenError when no replica is
+    available and RequestException when the attempt(s) failed.
+    """
+    endpoint = upstream.acquire()
+    if endpoint is None:
+        raise CircuitOpenError(upstream.retry_after())
+
+    delay = None
+    if Config.HEDGE_ENABLED and upstream_request["method"] == "GET" and not upstream_request.get("data"):
+        delay = upstream.hedge_delay()
+    if delay is None:
+        return endpoint, send(upstream, endpoint, path, upstream_request, stream)
+
+    executor = get_hedge_executor()
+    primary = executor.submit(send, upstream, endpoint, path, upstream_request, stream)
+    try:
+        return endpoint, primary.result(timeout=delay)
+    except FutureTimeoutError:
+        pass
+
+    # The first attempt is slower than p95: race it against another replica
+    backup_endpoint = upstream.acquire(exclude=endpoint)
+    if backup_endpoint is None:
+        return endpoint, primary.result()
+    backup = executor.submit(send, upstream, backup_endpoint, path, upstream_request, stream)
+
+    attempts = {primary: endpoint, backup: backup_endpoint}
+    pending = set(attempts)
+    winner = None
+    error = None
+    while pending and winner is None:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is not None:
+                error = future.exception()
+            elif winner is None:
+                winner = future
+            else:
+                _discard(upstream, attempts[future], future)
+
+    for future in pending:
+        future.add_done_callback(partial(_discard, upstream, attempts[future]))
+    if winner is None:
+        raise error
+    return attempts[winner], winner.result()
+
+
+def get_pool_stats():
+    """Snapshot of replica load and connection pool usage for every upstream"""
+    stats = {}
+    for service_url, upstream in list(_upstreams.items()):
+        hosts = []
+        session = _sessions.get(service_url)
+        if session is not None:
+            pools = session.get_adapter(service_url).poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                hosts.append({
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    "maxsize": pool.pool.maxsize if pool.pool else 0,
+                    # The pool queue is padded with None placeholders for unopened slots
+                    "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+                    "connections_opened": pool.num_connections,
+                    "requests_sent": pool.num_requests,
+                })
+        stats[service_url] = {**upstream.stats(), "pools": hosts}
+    return stats
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, get_jwt_identity
+from .internal_auth import jwt_required
 from werkzeug.security import generate_password_hash, check_password_hash
-import requests
+from .http_client import http
 from .models import db, User
 from .config import Config
 
@@ -45,7 +46,7 @@ def register():
     # Notify user-service to create user profile
     try:
         user_service_url = Config.USER_SERVICE_URL
-        response = requests.post(
+        response = http.post(
             f"{user_service_url}/api/users/create",
             json={
                 "user_id": user.id,
@@ -113,7 +114,7 @@ def create_admin():
     # Notify user-service to create user profile
     try:
         user_service_url = Config.USER_SERVICE_URL
-        response = requests.post(
+        response = http.post(
             f"{user_service_url}/api/users/create",
             json={
                 "user_id": user.id,
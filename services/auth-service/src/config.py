@@ -3,6 +3,8 @@ import os
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "auth-service-secret")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-secret-key")
+    # Shared with the API gateway to trust the claims it has already verified
+    INTERNAL_AUTH_SECRET = os.getenv("INTERNAL_AUTH_SECRET", "")
     
     # Build DATABASE_URL from components for better security
     DB_USER = os.getenv("DB_USER", "authuser")
@@ -16,6 +18,9 @@ class Config:
         f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Apply pending schema migrations (src/migrations.py) when the app starts;
+    # disable to run them separately with `python -m src.migrations`
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
     REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
     ENV = os.getenv("ENV", "development")
     DEBUG = ENV == "development"
@@ -24,3 +29,12 @@ class Config:
     
     # Service discovery
     USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user-service:8002")
+
+    # Tracing: W3C traceparent and X-Request-ID propagation, spans exported as
+    # JSON lines to TRACE_EXPORT_PATH and/or POSTed to TRACE_COLLECTOR_URL
+    SERVICE_NAME = os.getenv("SERVICE_NAME", "auth-service")
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+    TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+    TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
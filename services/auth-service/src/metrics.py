@@ -0,0 +1,107 @@
+import os
+import re
+import time
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+
+# Latency buckets in seconds, spanning cache hits to slow reports
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to produce an HTTP response", ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", multiprocess_mode="livesum"
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Latency of calls to other services", ["target", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Database query latency", ["operation", "table"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# First table a statement reads from or writes to, for the table label
+TABLE_PATTERN = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)", re.IGNORECASE)
+
+
+def get_route_label():
+    """The matched URL rule, so /api/x/1 and /api/x/2 share one series"""
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def get_registry():
+    """Under a pre-fork server every worker writes its own files; sum them on scrape"""
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def observe_upstream(target, method, status, duration):
+    UPSTREAM_LATENCY.labels(target, method, status).observe(duration)
+
+
+def instrument_engine(engine):
+    """Time every statement the engine executes"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.split(None, 1)[0].lower() if statement.strip() else "unknown"
+        match = TABLE_PATTERN.search(statement)
+        DB_QUERY_LATENCY.labels(operation, match.group(1) if match else "none").observe(
+            time.perf_counter() - started
+        )
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def init_metrics(app, engine=None):
+    """Record per-route request metrics and serve them on /metrics"""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(error=None):
+        # Streamed responses are timed to the first byte
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        REQUESTS_IN_FLIGHT.dec()
+        route = get_route_label()
+        status = g.pop("metrics_status", 500)
+        REQUEST_COUNT.labels(request.method, route, str(status)).inc()
+        REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(generate_latest(get_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+    if engine is not None:
+        instrument_engine(engine)
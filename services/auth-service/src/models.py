@@ -17,16 +17,18 @@ class User(db.Model):
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 def init_db(app):
-    """Initialize database"""
+    """Initialize database, apply pending schema migrations and seed the admin"""
     db.init_app(app)
     with app.app_context():
-        db.create_all()
+        if app.config.get("MIGRATE_ON_STARTUP", True):
+            from .migrations import migrate
+            migrate(db.engine)
         _ensure_bootstrap_admin(app)
 
 def _ensure_bootstrap_admin(app):
     """Create bootstrap admin if configured"""
     import os
-    import requests
+    from .http_client import http
     from werkzeug.security import generate_password_hash
 
     admin_email = (os.getenv("ADMIN_EMAIL") or "").strip().lower()
@@ -58,7 +60,7 @@ def _ensure_bootstrap_admin(app):
     # Also create user profile in user-service
     try:
         user_service_url = os.getenv("USER_SERVICE_URL", "http://user-service:8002")
-        response = requests.post(
+        response = http.post(
             f"{user_service_url}/api/users/create",
             json={
                 "user_id": user.id,
@@ -0,0 +1,23 @@
+# Gunicorn settings for the notification service in production.
+#
+# Socket.IO keeps each client on the worker that accepted it, so the service
+# runs a single eventlet worker per pod that multiplexes thousands of
+# websocket connections on green threads; scale out with more pods. The app
+# is not preloaded because eventlet must patch the standard library before
+# the app is imported.
+import os
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8004')}"
+wsgi_app = "src.app:create_server_app()"
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+worker_class = "eventlet"
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "2000"))
+
+# Long-lived websockets: never recycle workers on a request count
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
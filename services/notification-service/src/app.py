@@ -5,6 +5,7 @@ import redis
 import json
 from .config import Config
 from .api import notifications_bp, init_redis
+from .metrics import init_metrics
 
 socketio = SocketIO(cors_allowed_origins="*", async_mode="eventlet")
 
@@ -19,6 +20,9 @@ def create_app():
     # Initialize Redis
     init_redis(app)
 
+    # Metrics: per-route request counts and latency
+    init_metrics(app)
+
     # Register blueprints
     app.register_blueprint(notifications_bp, url_prefix="/api/notifications")
 
@@ -44,13 +48,15 @@ def listen_to_redis(app):
             except Exception as e:
                 app.logger.error(f"Error processing Redis message: {e}")
 
-if __name__ == "__main__":
+def create_server_app():
+    """Create the app with Socket.IO and the Redis listener attached"""
     app = create_app()
     socketio.init_app(app)
-    
-    # Start Redis listener in background
-    import threading
-    redis_thread = threading.Thread(target=listen_to_redis, args=(app,), daemon=True)
-    redis_thread.start()
-    
+
+    # Start Redis listener in background (a green thread under eventlet)
+    socketio.start_background_task(listen_to_redis, app)
+    return app
+
+if __name__ == "__main__":
+    app = create_server_app()
     socketio.run(app, host="0.0.0.0", port=8004, debug=True)
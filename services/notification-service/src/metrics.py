@@ -0,0 +1,52 @@
+import time
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Latency buckets in seconds, spanning cache hits to slow reports
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_COUNT = Counter(
+    "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to produce an HTTP response", ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+)
+
+
+def get_route_label():
+    """The matched URL rule, so /api/x/1 and /api/x/2 share one series"""
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def init_metrics(app):
+    """Record per-route request metrics and serve them on /metrics"""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+        REQUESTS_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(error=None):
+        # Streamed responses are timed to the first byte
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return
+        REQUESTS_IN_FLIGHT.dec()
+        route = get_route_label()
+        status = g.pop("metrics_status", 500)
+        REQUEST_COUNT.labels(request.method, route, str(status)).inc()
+        REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,79 @@
+# Gunicorn settings for the tournament service in production.
+#
+# The app is loaded once in the master and forked into the workers, so
+# imports and startup work (schema migrations under an advisory lock)
+# run a single time and the workers share those pages copy-on-write.
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+
+def cpu_limit():
+    """CPUs available to this container: the cgroup quota if set, else the host count"""
+    try:
+        # cgroup v2
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(quota) // int(period))
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0:
+            return max(1, quota // period)
+    except (OSError, ValueError):
+        pass
+    return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8003')}"
+wsgi_app = "src.app:create_app()"
+preload_app = True
+
+# Threads overlap the database and inter-service I/O inside each worker
+workers = int(os.getenv("WEB_CONCURRENCY", str(cpu_limit() * 2 + 1)))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+# Recycle workers gradually so slow leaks never take down every worker at once
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = "-"
+errorlog = "-"
+
+# Each worker writes its metrics to files here. Files from a previous run would
+# be summed into the new ones, so reset the directory before the app loads.
+metrics_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if metrics_dir:
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Connections opened by the master during startup must not be shared
+    # between workers; drop them without closing the master's sockets
+    from src.models import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    # Follow user directory changes from the start rather than the first request
+    if app.config.get("USER_DIRECTORY_SYNC_ENABLED"):
+        from src import user_directory
+        user_directory.ensure_listener(app)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,10 +1,27 @@
+import base64
+import csv
+import json
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from .internal_auth import jwt_required
 from datetime import datetime
-from .models import db, Tournament, Participant, Bracket
+from .models import db, Tournament, Participant, Bracket, reserve_spots
+from .config import Config
+from .events import publish_event
+from . import bracket_engine, leaderboard, participant_import, user_directory
 
 tournaments_bp = Blueprint("tournaments", __name__)
 
+@tournaments_bp.after_request
+def publish_cache_invalidation(response):
+    """Tell gateways to drop cached tournament responses after a successful write"""
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        publish_event(Config.CACHE_INVALIDATION_CHANNEL, {"resource": "tournaments"})
+    return response
+
 def get_current_user_role():
     """Helper to get current user role from JWT"""
     claims = get_jwt()
@@ -42,6 +59,9 @@ def create_tournament():
     if not start_date:
         return jsonify({"detail": "Start date is required"}), 400
 
+    if tournament_type not in bracket_engine.GENERATORS:
+        return jsonify({"detail": f"Unsupported tournament type: {tournament_type}"}), 400
+
     try:
         start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
     except (ValueError, AttributeError):
@@ -66,12 +86,100 @@ def create_tournament():
         logging.error(f"Error creating tournament: {str(e)}")
         return jsonify({"detail": f"Failed to create tournament: {str(e)}"}), 500
 
+# Columns the tournament listing can project with ?fields=
+LIST_COLUMNS = {
+    "id": Tournament.id,
+    "name": Tournament.name,
+    "start_date": Tournament.start_date,
+    "max_participants": Tournament.max_participants,
+    "tournament_type": Tournament.tournament_type,
+    "status": Tournament.status,
+    "created_at": Tournament.created_at,
+    "participant_count": Tournament.approved_count,
+}
+LIST_FIELDS = list(LIST_COLUMNS)
+
+def parse_iso_datetime(value):
+    """Parse an ISO 8601 timestamp, accepting a trailing Z; None when invalid"""
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+
+def encode_cursor(start_date, tournament_id):
+    """Opaque cursor pointing just past the given row in listing order"""
+    raw = json.dumps([start_date.isoformat(), tournament_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Return (start_date, id) from a cursor, or None when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        start_date, tournament_id = json.loads(raw)
+        return datetime.fromisoformat(start_date), int(tournament_id)
+    except (ValueError, TypeError):
+        return None
+
 @tournaments_bp.get("/")
 @jwt_required()
 def list_tournaments():
-    """List all tournaments"""
-    tournaments = Tournament.query.all()
-    return jsonify({"tournaments": [t.to_dict() for t in tournaments]}), 200
+    """List tournaments, newest start date first, one page at a time
+
+    Filters: status, starts_after, starts_before. Pages are keyset-paginated
+    with limit and the previous page's next_cursor; fields selects a subset of
+    LIST_FIELDS.
+    """
+    try:
+        limit = int(request.args.get("limit", Config.TOURNAMENT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"detail": "limit must be an integer"}), 400
+    limit = max(1, min(limit, Config.TOURNAMENT_MAX_PAGE_SIZE))
+
+    fields = LIST_FIELDS
+    if request.args.get("fields"):
+        fields = [f.strip() for f in request.args["fields"].split(",") if f.strip()]
+        unknown = [f for f in fields if f not in LIST_FIELDS]
+        if unknown:
+            return jsonify({"detail": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    # id and start_date are always read since the cursor is built from them
+    selected = {"id", "start_date", *fields}
+    query = db.session.query(*[column.label(name) for name, column in LIST_COLUMNS.items() if name in selected])
+
+    status = request.args.get("status")
+    if status:
+        query = query.filter(Tournament.status == status)
+    if request.args.get("starts_after"):
+        starts_after = parse_iso_datetime(request.args["starts_after"])
+        if starts_after is None:
+            return jsonify({"detail": "Invalid starts_after date format"}), 400
+        query = query.filter(Tournament.start_date >= starts_after)
+    if request.args.get("starts_before"):
+        starts_before = parse_iso_datetime(request.args["starts_before"])
+        if starts_before is None:
+            return jsonify({"detail": "Invalid starts_before date format"}), 400
+        query = query.filter(Tournament.start_date < starts_before)
+
+    if request.args.get("cursor"):
+        position = decode_cursor(request.args["cursor"])
+        if position is None:
+            return jsonify({"detail": "Invalid cursor"}), 400
+        query = query.filter(tuple_(Tournament.start_date, Tournament.id) < tuple_(*position))
+
+    # Fetch one extra row to learn whether another page follows
+    rows = query.order_by(Tournament.start_date.desc(), Tournament.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1].start_date, rows[limit - 1].id) if len(rows) > limit else None
+    rows = rows[:limit]
+
+    tournaments = []
+    for row in rows:
+        item = {}
+        for name in fields:
+            value = getattr(row, name)
+            item[name] = value.isoformat() if isinstance(value, datetime) else value
+        tournaments.append(item)
+
+    return jsonify({"tournaments": tournaments, "next_cursor": next_cursor}), 200
 
 @tournaments_bp.get("/<int:tournament_id>")
 @jwt_required()
@@ -98,10 +206,16 @@ def delete_tournament(tournament_id):
         return jsonify({"detail": "Tournament not found"}), 404
     
     try:
+        # Take the tournament's results out of the standings
+        standings = leaderboard.new_deltas()
+        leaderboard.add_bracket(standings, tournament, -1)
+        ranked_users = leaderboard.apply(standings)
+
         # Cascade delete will automatically remove participants and brackets
         db.session.delete(tournament)
         db.session.commit()
         
+        leaderboard.publish(ranked_users)
         return jsonify({"message": "Tournament deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -141,8 +255,13 @@ def add_participant(tournament_id):
         tournament_id=tournament_id,
         user_id=user_id,
         name=name,
+        status="approved",
     )
 
+    if not reserve_spots(tournament_id):
+        db.session.rollback()
+        return jsonify({"detail": "Tournament is full"}), 400
+
     db.session.add(participant)
     db.session.commit()
 
@@ -182,10 +301,15 @@ def add_participants_bulk(tournament_id):
     if not participants_data:
         return jsonify({"detail": "No participants provided"}), 400
     
-    # Validate participant names
+    # Validate participant names and user ids
     for p_data in participants_data:
         if not p_data.get("name"):
             return jsonify({"detail": "All participants must have a name"}), 400
+        if p_data.get("user_id"):
+            try:
+                p_data["user_id"] = int(p_data["user_id"])
+            except (TypeError, ValueError):
+                return jsonify({"detail": "user_id must be an integer"}), 400
     
     # Determine status based on role
     participant_status = "approved"  # Default for trainers/admins
@@ -208,33 +332,33 @@ def add_participants_bulk(tournament_id):
     elif role not in ["trainer", "admin"]:
         return jsonify({"detail": "Unauthorized to add participants"}), 403
     
-    # Check max participants limit (only count approved participants)
-    approved_count = Participant.query.filter_by(
-        tournament_id=tournament_id,
-        status="approved"
-    ).count()
-    new_count = approved_count + len(participants_data)
-    if new_count > tournament.max_participants and participant_status == "approved":
-        return jsonify({
-            "detail": f"Cannot add {len(participants_data)} participants. Tournament has {approved_count}/{tournament.max_participants} participants."
-        }), 400
-    
     try:
+        # One query for every participant that is already registered
+        user_ids = [p_data.get("user_id") for p_data in participants_data if p_data.get("user_id")]
+        existing = {}
+        if user_ids:
+            existing = {
+                p.user_id: p
+                for p in Participant.query.filter(
+                    Participant.tournament_id == tournament_id, Participant.user_id.in_(user_ids)
+                )
+            }
+        for user_id in user_ids:
+            if user_id in existing:
+                if existing[user_id].status == "pending":
+                    return jsonify({"detail": f"You already have a pending request for this tournament"}), 400
+                else:
+                    return jsonify({"detail": f"User is already a participant in this tournament"}), 400
+
+        # Take every approved spot at once, or none (only approved participants count)
+        if participant_status == "approved" and not reserve_spots(tournament_id, len(participants_data)):
+            db.session.rollback()
+            return jsonify({
+                "detail": f"Cannot add {len(participants_data)} participants. Tournament has {tournament.approved_count}/{tournament.max_participants} participants."
+            }), 400
+
         added_participants = []
         for p_data in participants_data:
-            # Check if user is already a participant (pending or approved)
-            user_id = p_data.get("user_id")
-            if user_id:
-                existing = Participant.query.filter_by(
-                    tournament_id=tournament_id,
-                    user_id=user_id
-                ).first()
-                if existing:
-                    if existing.status == "pending":
-                        return jsonify({"detail": f"You already have a pending request for this tournament"}), 400
-                    else:
-                        return jsonify({"detail": f"User is already a participant in this tournament"}), 400
-            
             participant = Participant(
                 tournament_id=tournament_id,
                 user_id=p_data.get("user_id"),
@@ -260,54 +384,71 @@ def add_participants_bulk(tournament_id):
         db.session.rollback()
         return jsonify({"detail": f"Failed to add participants: {str(e)}"}), 500
 
-@tournaments_bp.get("/available-users")
+@tournaments_bp.post("/<int:tournament_id>/participants/import")
 @jwt_required()
-def get_available_users():
-    """Get list of available users from user-service"""
-    import requests
-    from .config import Config
-    
-    # Only trainers and admins can see available users
+def import_participants(tournament_id):
+    """Import approved participants in bulk - trainer or admin only
+
+    The body is a JSON array (or {"participants": [...]}), CSV with a header
+    row, or NDJSON (application/x-ndjson). Rows have name, optional user_id
+    and optional seed. Valid rows are added even when others are rejected;
+    the response reports the outcome of every row.
+    """
     error = require_trainer_or_admin()
     if error:
         return error
-    
+
+    if not Tournament.query.filter_by(id=tournament_id).first():
+        return jsonify({"detail": "Tournament not found"}), 404
+
     try:
-        # Fetch users from user-service
-        user_service_url = Config.USER_SERVICE_URL
-        
-        # Get the JWT token from the current request
-        from flask import request as flask_request
-        auth_header = flask_request.headers.get('Authorization', '')
-        
-        response = requests.get(
-            f"{user_service_url}/api/users/",
-            headers={'Authorization': auth_header},
-            timeout=5
-        )
-        
-        if response.status_code == 200:
-            users_data = response.json()
-            # Transform user data to match expected format
-            users = [
-                {
-                    "id": user.get("id"),
-                    "name": user.get("full_name") or user.get("email"),
-                    "email": user.get("email")
-                }
-                for user in users_data
-                if user.get("is_approved") and not user.get("is_banned")
-            ]
-            return jsonify({"users": users}), 200
-        else:
-            # Return empty list if user-service fails
-            return jsonify({"users": []}), 200
-            
+        rows = participant_import.read_rows(request.mimetype, request.stream, request.get_json)
+        summary, results = participant_import.import_participants(tournament_id, rows)
+        db.session.commit()
+    except participant_import.ImportTooLarge:
+        db.session.rollback()
+        return jsonify({"detail": f"Imports are limited to {Config.PARTICIPANT_IMPORT_MAX_ROWS} rows"}), 413
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        db.session.rollback()
+        return jsonify({"detail": f"Could not read participants: {str(e)}"}), 400
     except Exception as e:
-        # Log error but return empty list to not break the UI
+        db.session.rollback()
         import logging
-        logging.error(f"Error fetching users from user-service: {str(e)}")
-        return jsonify({"users": []}), 200
+        logging.error(f"Error importing participants: {str(e)}")
+        return jsonify({"detail": f"Failed to import participants: {str(e)}"}), 500
+
+    return jsonify({
+        "message": f"{summary['added']} participants imported",
+        "summary": summary,
+        "results": results,
+    }), 200
+
+@tournaments_bp.get("/available-users")
+@jwt_required()
+def get_available_users():
+    """Search approved, non-banned users to add as participants - trainer or admin only
+
+    Reads the local copy of the user directory. q matches the start of a
+    name or email; pages follow next_cursor like the tournament listing.
+    """
+    error = require_trainer_or_admin()
+    if error:
+        return error
+
+    try:
+        limit = int(request.args.get("limit", Config.USER_DIRECTORY_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"detail": "limit must be an integer"}), 400
+    limit = max(1, min(limit, Config.USER_DIRECTORY_MAX_PAGE_SIZE))
+
+    after = None
+    if request.args.get("cursor"):
+        after = user_directory.decode_cursor(request.args["cursor"])
+        if after is None:
+            return jsonify({"detail": "Invalid cursor"}), 400
+
+    users, next_cursor = user_directory.search(request.args.get("q"), limit, after)
+    return jsonify({"users": [u.to_dict() for u in users], "next_cursor": next_cursor}), 200
 
 @tournaments_bp.patch("/<int:tournament_id>/participants/<int:participant_id>/approve")
 @jwt_required()
@@ -332,16 +473,20 @@ def approve_participant(tournament_id, participant_id):
     if participant.status != "pending":
         return jsonify({"detail": "Participant is not pending approval"}), 400
     
-    # Check if tournament is full
-    approved_count = Participant.query.filter_by(
-        tournament_id=tournament_id,
-        status="approved"
-    ).count()
-    
-    if approved_count >= tournament.max_participants:
+    # Take a spot, then approve only if nobody approved the request meanwhile
+    if not reserve_spots(tournament_id):
+        db.session.rollback()
         return jsonify({"detail": "Tournament is full"}), 400
-    
-    participant.status = "approved"
+
+    approved = db.session.execute(
+        update(Participant)
+        .where(Participant.id == participant_id, Participant.status == "pending")
+        .values(status="approved")
+        .execution_options(synchronize_session=False)
+    )
+    if approved.rowcount == 0:
+        db.session.rollback()
+        return jsonify({"detail": "Participant is not pending approval"}), 400
     db.session.commit()
     
     return jsonify({
@@ -361,98 +506,123 @@ def generate_bracket(tournament_id):
     if not tournament:
         return jsonify({"detail": "Tournament not found"}), 404
     
-    # Get approved participants only
-    participants = Participant.query.filter_by(
-        tournament_id=tournament_id,
-        status="approved"
-    ).all()
-    
-    if len(participants) < 2:
+    # Approved participants in seed order; unseeded entrants follow by registration
+    participant_ids = [
+        row.id
+        for row in db.session.query(Participant.id)
+        .filter_by(tournament_id=tournament_id, status="approved")
+        .order_by(Participant.seed.is_(None), Participant.seed, Participant.id)
+    ]
+
+    if len(participant_ids) < 2:
         return jsonify({"detail": "Need at least 2 approved participants to generate bracket"}), 400
-    
-    # Delete existing brackets
-    Bracket.query.filter_by(tournament_id=tournament_id).delete()
-    
-    # Simple single elimination bracket generation
-    import math
-    num_participants = len(participants)
-    
-    # Assign seeds
-    for idx, participant in enumerate(participants):
-        participant.seed = idx + 1
-    
-    # Calculate number of rounds needed
-    num_rounds = math.ceil(math.log2(num_participants))
-    
-    # First round matchups
-    matches_first_round = []
-    for i in range(0, len(participants), 2):
-        p1 = participants[i] if i < len(participants) else None
-        p2 = participants[i + 1] if (i + 1) < len(participants) else None
-        
-        bracket = Bracket(
-            tournament_id=tournament_id,
-            round=1,
-            match_number=len(matches_first_round) + 1,
-            participant1_id=p1.id if p1 else None,
-            participant2_id=p2.id if p2 else None,
+
+    try:
+        rows = bracket_engine.generate(tournament.tournament_type, participant_ids)
+    except ValueError as e:
+        return jsonify({"detail": str(e)}), 400
+
+    try:
+        # Results of a bracket being replaced no longer count
+        standings = leaderboard.new_deltas()
+        leaderboard.add_bracket(standings, tournament, -1)
+        ranked_users = leaderboard.apply(standings)
+
+        # Replace any existing bracket: one DELETE, one seed UPDATE and one INSERT
+        Bracket.query.filter_by(tournament_id=tournament_id).delete()
+        db.session.execute(
+            update(Participant),
+            [{"id": participant_id, "seed": seed} for seed, participant_id in enumerate(participant_ids, 1)],
         )
-        db.session.add(bracket)
-        matches_first_round.append(bracket)
-    
-    # Create placeholder matches for subsequent rounds
-    current_round_matches = matches_first_round
-    for round_num in range(2, num_rounds + 1):
-        next_round_matches = []
-        for i in range(0, len(current_round_matches), 2):
-            bracket = Bracket(
-                tournament_id=tournament_id,
-                round=round_num,
-                match_number=len(next_round_matches) + 1,
-            )
-            db.session.add(bracket)
-            next_round_matches.append(bracket)
-        current_round_matches = next_round_matches
-    
-    tournament.status = "active"
-    db.session.commit()
-    
+        db.session.execute(Bracket.__table__.insert(), [{**row, "tournament_id": tournament_id} for row in rows])
+
+        tournament.status = "active"
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        import logging
+        logging.error(f"Error generating bracket: {str(e)}")
+        return jsonify({"detail": f"Failed to generate bracket: {str(e)}"}), 500
+
+    leaderboard.publish(ranked_users)
+    size = bracket_engine.bracket_size(len(participant_ids))
     return jsonify({
         "message": "Bracket generated successfully",
-        "rounds": num_rounds,
-        "matches": len(matches_first_round)
+        "rounds": size.bit_length() - 1,
+        "matches": size // 2,
+        "byes": size - len(participant_ids),
     }), 200
 
+def load_matches(tournament_id):
+    """Matches in play order with their participants loaded up front, not per match"""
+    return (
+        Bracket.query.filter_by(tournament_id=tournament_id)
+        .options(
+            selectinload(Bracket.participant1),
+            selectinload(Bracket.participant2),
+            selectinload(Bracket.winner),
+        )
+        .order_by(Bracket.round, Bracket.match_number)
+        .all()
+    )
+
+def compact_bracket(tournament, participants, matches):
+    """Bracket with one participant table and matches as rows of ids"""
+    return {
+        "tournament": tournament.to_dict(),
+        "participants": [p.to_dict() for p in participants],
+        "match_fields": Bracket.ROW_FIELDS,
+        "matches": [m.to_row() for m in matches],
+    }
+
 @tournaments_bp.get("/<int:tournament_id>/brackets")
 @jwt_required()
 def get_brackets(tournament_id):
-    """Get tournament brackets"""
+    """Get tournament brackets; ?format=compact returns the compact bracket"""
     tournament = Tournament.query.filter_by(id=tournament_id).first()
     
     if not tournament:
         return jsonify({"detail": "Tournament not found"}), 404
-    
-    brackets = Bracket.query.filter_by(tournament_id=tournament_id).order_by(Bracket.round, Bracket.match_number).all()
-    return jsonify([b.to_dict() for b in brackets]), 200
+
+    if request.args.get("format") == "compact":
+        participants = Participant.query.filter_by(tournament_id=tournament_id).all()
+        matches = Bracket.query.filter_by(tournament_id=tournament_id).order_by(Bracket.round, Bracket.match_number).all()
+        return jsonify(compact_bracket(tournament, participants, matches)), 200
+
+    return jsonify([b.to_dict() for b in load_matches(tournament_id)]), 200
 
 @tournaments_bp.get("/<int:tournament_id>/bracket")
 @jwt_required()
 def get_bracket(tournament_id):
-    """Get tournament bracket (alias for /brackets endpoint)"""
+    """Get tournament bracket (alias for /brackets endpoint); ?format=compact
+    references participants by id instead of embedding them in every match"""
     tournament = Tournament.query.filter_by(id=tournament_id).first()
     
     if not tournament:
         return jsonify({"detail": "Tournament not found"}), 404
     
-    brackets = Bracket.query.filter_by(tournament_id=tournament_id).order_by(Bracket.round, Bracket.match_number).all()
     participants = Participant.query.filter_by(tournament_id=tournament_id).all()
-    
+
+    if request.args.get("format") == "compact":
+        matches = Bracket.query.filter_by(tournament_id=tournament_id).order_by(Bracket.round, Bracket.match_number).all()
+        return jsonify(compact_bracket(tournament, participants, matches)), 200
+
     return jsonify({
         "tournament": tournament.to_dict(),
-        "bracket": [b.to_dict() for b in brackets],
+        "bracket": [b.to_dict() for b in load_matches(tournament_id)],
         "participants": [p.to_dict() for p in participants]
     }), 200
 
+def result_error(bracket, winner_id):
+    """Why a result cannot be recorded for this match, or None when it can"""
+    if not bracket.participant1_id or not bracket.participant2_id:
+        return "Cannot record result: both participants must be assigned"
+    if not winner_id:
+        return "winner_id is required"
+    if winner_id not in [bracket.participant1_id, bracket.participant2_id]:
+        return "Winner must be one of the match participants"
+    return None
+
 @tournaments_bp.put("/<int:tournament_id>/bracket/<int:bracket_id>/result")
 @jwt_required()
 def record_result(tournament_id, bracket_id):
@@ -465,120 +635,194 @@ def record_result(tournament_id, bracket_id):
     if not tournament:
         return jsonify({"detail": "Tournament not found"}), 404
     
-    bracket = Bracket.query.filter_by(id=bracket_id, tournament_id=tournament_id).first()
+    # Lock the match so concurrent results for it are applied one at a time
+    bracket = (
+        Bracket.query.filter_by(id=bracket_id, tournament_id=tournament_id)
+        .with_for_update()
+        .first()
+    )
     
     if not bracket:
         return jsonify({"detail": "Match not found"}), 404
     
-    # Validate both participants are assigned
-    if not bracket.participant1_id or not bracket.participant2_id:
-        return jsonify({"detail": "Cannot record result: both participants must be assigned"}), 400
-    
     payload = request.get_json(silent=True) or {}
     winner_id = payload.get("winner_id")
     score = payload.get("score", "")
+    expected_version = payload.get("version")
+
+    error = result_error(bracket, winner_id)
+    if error:
+        return jsonify({"detail": error}), 400
+
+    # Clients that send the version they saw get a conflict instead of
+    # silently overwriting a result recorded in the meantime
+    if expected_version is not None and expected_version != bracket.version:
+        db.session.rollback()
+        return jsonify({"detail": "Match was updated by someone else, reload the bracket and try again"}), 409
     
-    if not winner_id:
-        return jsonify({"detail": "winner_id is required"}), 400
-    
-    # Validate winner is one of the participants
-    if winner_id not in [bracket.participant1_id, bracket.participant2_id]:
-        return jsonify({"detail": "Winner must be one of the match participants"}), 400
-    
+    standings = leaderboard.new_deltas()
+    leaderboard.add_result(standings, bracket, tournament, winner_id)
     bracket.winner_id = winner_id
     bracket.score = score
     
-    # Advance winner to next round
-    next_round = bracket.round + 1
-    next_match_number = (bracket.match_number + 1) // 2
-    
-    next_bracket = Bracket.query.filter_by(
-        tournament_id=tournament_id,
-        round=next_round,
-        match_number=next_match_number
-    ).first()
-    
-    if next_bracket:
-        # Determine which slot to fill (participant1 or participant2)
-        if bracket.match_number % 2 == 1:
-            next_bracket.participant1_id = winner_id
-        else:
-            next_bracket.participant2_id = winner_id
-    
-    db.session.commit()
-    
-    # Check if this was the final match
-    final_round_matches = Bracket.query.filter_by(tournament_id=tournament_id).all()
-    if final_round_matches:
-        max_round = max(m.round for m in final_round_matches)
-        final_match = Bracket.query.filter_by(
-            tournament_id=tournament_id,
-            round=max_round
-        ).first()
+    try:
+        # Advance the winner with one indexed UPDATE of just their slot, so a
+        # result for the adjacent match cannot overwrite the other slot. A
+        # next match that has already been played is left alone.
+        if bracket.next_match_number is not None:
+            slot = Bracket.participant1_id if bracket.next_slot == 1 else Bracket.participant2_id
+            advanced = db.session.execute(
+                update(Bracket)
+                .where(
+                    Bracket.tournament_id == tournament_id,
+                    Bracket.round == bracket.round + 1,
+                    Bracket.match_number == bracket.next_match_number,
+                    Bracket.winner_id.is_(None),
+                )
+                .values({slot: winner_id, Bracket.version: Bracket.version + 1})
+                .execution_options(synchronize_session=False)
+            )
+            if advanced.rowcount == 0:
+                db.session.rollback()
+                return jsonify({"detail": "The next match has already been played"}), 409
         
-        if final_match and final_match.winner_id:
+        if bracket.is_final:
             tournament.status = "completed"
-            db.session.commit()
+        
+        ranked_users = leaderboard.apply(standings)
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({"detail": "Match was updated by someone else, reload the bracket and try again"}), 409
     
+    leaderboard.publish(ranked_users)
     return jsonify({
         "message": "Match result recorded successfully",
         "bracket": bracket.to_dict()
     }), 200
-    winner_id = payload.get("winner_id")
-    score = payload.get("score")
-    
-    if not winner_id:
-        return jsonify({"detail": "Winner ID is required"}), 400
-    
-    # Validate winner is one of the participants
-    if winner_id not in [bracket.participant1_id, bracket.participant2_id]:
-        return jsonify({"detail": "Winner must be one of the match participants"}), 400
-    
-    try:
+
+@tournaments_bp.put("/<int:tournament_id>/rounds/<int:round_number>/results")
+@jwt_required()
+def record_round_results(tournament_id, round_number):
+    """Record many results of one round in a single transaction
+
+    Body: {"results": [{"match_number" or "bracket_id", "winner_id", "score",
+    "version"}]}. Either every result is recorded and every winner advanced,
+    or nothing is and the response lists what was wrong.
+    """
+    error = require_trainer_or_admin()
+    if error:
+        return error
+
+    tournament = Tournament.query.filter_by(id=tournament_id).first()
+    if not tournament:
+        return jsonify({"detail": "Tournament not found"}), 404
+
+    payload = request.get_json(silent=True) or {}
+    results = payload.get("results")
+    if not isinstance(results, list) or not results:
+        return jsonify({"detail": "results must be a non-empty list"}), 400
+
+    # The round and the round its winners move into, locked together
+    matches = (
+        Bracket.query.filter(Bracket.tournament_id == tournament_id, Bracket.round.in_([round_number, round_number + 1]))
+        .order_by(Bracket.round, Bracket.match_number)
+        .with_for_update()
+        .all()
+    )
+    round_matches = {m.match_number: m for m in matches if m.round == round_number}
+    by_id = {m.id: m for m in round_matches.values()}
+    next_matches = {m.match_number: m for m in matches if m.round == round_number + 1}
+    if not round_matches:
+        return jsonify({"detail": "Round not found"}), 404
+
+    errors = []
+    recorded = {}
+    standings = leaderboard.new_deltas()
+    for index, result in enumerate(results):
+        if not isinstance(result, dict):
+            errors.append({"index": index, "detail": "Each result must be an object"})
+            continue
+        if "bracket_id" in result:
+            bracket = by_id.get(result["bracket_id"])
+        else:
+            bracket = round_matches.get(result.get("match_number"))
+        if bracket is None:
+            errors.append({"index": index, "detail": "Match not found in this round"})
+            continue
+        if bracket.id in recorded:
+            errors.append({"index": index, "detail": "Match appears more than once"})
+            continue
+
+        winner_id = result.get("winner_id")
+        error = result_error(bracket, winner_id)
+        if error is None and result.get("version") is not None and result["version"] != bracket.version:
+            error = "Match was updated by someone else, reload the bracket and try again"
+        next_bracket = next_matches.get(bracket.next_match_number)
+        if error is None and next_bracket is not None and next_bracket.winner_id is not None:
+            error = "The next match has already been played"
+        if error:
+            errors.append({"index": index, "match_number": bracket.match_number, "detail": error})
+            continue
+
+        leaderboard.add_result(standings, bracket, tournament, winner_id)
         bracket.winner_id = winner_id
-        if score:
-            bracket.score = score
-        
+        bracket.score = result.get("score", "")
+        if next_bracket is not None:
+            setattr(next_bracket, f"participant{bracket.next_slot}_id", winner_id)
+        if bracket.is_final:
+            tournament.status = "completed"
+        recorded[bracket.id] = bracket
+
+    if errors:
+        db.session.rollback()
+        return jsonify({"detail": "No results were recorded", "errors": errors}), 400
+
+    try:
+        ranked_users = leaderboard.apply(standings)
+        db.session.flush()
+        # Serialize before commit expires the matches and each would be reloaded
+        rows = [m.to_row() for m in recorded.values()]
         db.session.commit()
-        
-        return jsonify({
-            "message": "Match result recorded successfully",
-            "bracket": bracket.to_dict()
-        }), 200
-    except Exception as e:
+    except StaleDataError:
         db.session.rollback()
-        return jsonify({"detail": f"Failed to record result: {str(e)}"}), 500
+        return jsonify({"detail": "Match was updated by someone else, reload the bracket and try again"}), 409
+
+    leaderboard.publish(ranked_users)
+    return jsonify({
+        "message": f"Recorded {len(recorded)} results",
+        "round": round_number,
+        "match_fields": Bracket.ROW_FIELDS,
+        "matches": rows,
+    }), 200
 
 @tournaments_bp.get("/leaderboard")
 def get_leaderboard():
-    """Get tournament leaderboard"""
+    """Get a page of the leaderboard, best first (?offset=&limit=)"""
     try:
-        # Get all participants with their scores
-        participants = db.session.query(Participant).filter_by(status='approved').all()
-        
-        # Create leaderboard entries
-        leaderboard = []
-        for participant in participants:
-            # Calculate total score from tournament results/wins
-            # For now, use a simple scoring system based on participation
-            score = 100  # Base score for participation
-            
-            # You can add more complex scoring logic here based on match results
-            leaderboard.append({
-                "user_name": participant.name,
-                "total_score": score,
-                "tournaments": 1,  # Each participant is in at least one tournament
-                "user_id": participant.user_id
-            })
-        
-        # Sort by score descending
-        leaderboard.sort(key=lambda x: x["total_score"], reverse=True)
-        
-        return jsonify(leaderboard), 200
-    except Exception as e:
-        import logging
-        logging.error(f"Error fetching leaderboard: {str(e)}")
-        return jsonify({"detail": f"Failed to fetch leaderboard: {str(e)}"}), 500
+        offset = max(0, int(request.args.get("offset", 0)))
+        limit = int(request.args.get("limit", Config.LEADERBOARD_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"detail": "offset and limit must be integers"}), 400
+    limit = max(1, min(limit, Config.LEADERBOARD_MAX_PAGE_SIZE))
+
+    entries, total = leaderboard.top(offset, limit)
+    return jsonify({
+        "leaderboard": entries,
+        "total_players": total,
+        "offset": offset,
+        "limit": limit,
+    }), 200
+
+@tournaments_bp.get("/leaderboard/me")
+@jwt_required()
+def get_my_standing():
+    """Get the current user's leaderboard entry and rank"""
+    try:
+        user_id = int(get_current_user_id())
+    except (TypeError, ValueError):
+        return jsonify({"detail": "User ID not found in token"}), 400
+    return jsonify({"standing": leaderboard.standing(user_id)}), 200
 
 @tournaments_bp.get("/health")
 def health():
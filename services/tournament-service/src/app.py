@@ -2,8 +2,11 @@ from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from .config import Config
-from .models import init_db
+from .models import db, init_db
+from .metrics import init_metrics
+from .tracing import init_tracing
 from .api import tournaments_bp
+from . import user_directory
 
 def create_app():
     """Create and configure the tournament service Flask app"""
@@ -19,6 +22,21 @@ def create_app():
     # Database
     init_db(app)
 
+    # Metrics and tracing: per-route latency, outbound calls and query timings
+    with app.app_context():
+        init_metrics(app, db.engine)
+        init_tracing(app, db.engine)
+
+    # Keep the local user directory in step with user-service: fill it now if
+    # it is empty, then follow changes from a listener thread. Gunicorn starts
+    # the thread as each worker forks; other servers on the first request.
+    if app.config.get("USER_DIRECTORY_SYNC_ENABLED"):
+        user_directory.initial_sync(app)
+
+        @app.before_request
+        def start_user_directory_listener():
+            user_directory.ensure_listener(app)
+
     # Register blueprints
     app.register_blueprint(tournaments_bp, url_prefix="/api/tournaments")
 
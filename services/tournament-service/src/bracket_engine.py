@@ -0,0 +1,119 @@
+"""In-memory bracket generation
+
+Brackets are computed as plain rows ready for a single bulk INSERT into the
+brackets table; nothing here touches the database.
+"""
+import time
+
+BYE_SCORE = "BYE"
+
+
+def bracket_size(entrants):
+    """Smallest power of two that fits every entrant"""
+    return 1 << (entrants - 1).bit_length()
+
+
+def seed_positions(size):
+    """Seeds in bracket order for a power-of-two bracket
+
+    Seed 1 meets seed `size` in the first round and the top two seeds can only
+    meet in the final, e.g. size 8 gives [1, 8, 4, 5, 2, 7, 3, 6].
+    """
+    positions = [1]
+    while len(positions) < size:
+        total = len(positions) * 2 + 1
+        positions = [seed for top in positions for seed in (top, total - top)]
+    return positions
+
+
+def single_elimination(participant_ids):
+    """Match rows for a seeded single-elimination bracket
+
+    participant_ids are ordered by seed. When the field is not a power of two
+    the top seeds get first-round byes: their match is stored already won and
+    they are placed straight into round two.
+    """
+    entrants = len(participant_ids)
+    size = bracket_size(entrants)
+    rounds = size.bit_length() - 1
+
+    def links(round_number, match_number):
+        # Winners of matches 2k-1 and 2k meet in match k of the next round
+        if round_number == rounds:
+            return {"next_match_number": None, "next_slot": None, "is_final": True}
+        return {"next_match_number": (match_number + 1) // 2, "next_slot": 2 - match_number % 2, "is_final": False}
+
+    rows = []
+    advancing = []
+    positions = seed_positions(size)
+    for match_number in range(1, size // 2 + 1):
+        seed1, seed2 = positions[2 * match_number - 2], positions[2 * match_number - 1]
+        participant1 = participant_ids[seed1 - 1]
+        participant2 = participant_ids[seed2 - 1] if seed2 <= entrants else None
+        bye = participant2 is None
+        rows.append({
+            "round": 1,
+            "match_number": match_number,
+            "participant1_id": participant1,
+            "participant2_id": participant2,
+            "winner_id": participant1 if bye else None,
+            "score": BYE_SCORE if bye else None,
+            **links(1, match_number),
+        })
+        advancing.append(participant1 if bye else None)
+
+    # Later rounds start empty apart from entrants who advanced on a bye
+    for round_number in range(2, rounds + 1):
+        matches = size >> round_number
+        for match_number in range(1, matches + 1):
+            rows.append({
+                "round": round_number,
+                "match_number": match_number,
+                "participant1_id": advancing[2 * match_number - 2] if round_number == 2 else None,
+                "participant2_id": advancing[2 * match_number - 1] if round_number == 2 else None,
+                "winner_id": None,
+                "score": None,
+                **links(round_number, match_number),
+            })
+    return rows
+
+
+# tournament_type -> generator
+GENERATORS = {
+    "single_elimination": single_elimination,
+}
+
+
+def generate(tournament_type, participant_ids):
+    """Match rows for a tournament; raises ValueError for unsupported types"""
+    generator = GENERATORS.get(tournament_type)
+    if generator is None:
+        raise ValueError(f"Unsupported tournament type: {tournament_type}")
+    if len(participant_ids) < 2:
+        raise ValueError("Need at least 2 participants to generate a bracket")
+    return generator(list(participant_ids))
+
+
+def benchmark(sizes=(8, 64, 512, 1000, 4096, 10000)):
+    """Time bracket computation and a bulk insert into in-memory SQLite"""
+    from sqlalchemy import create_engine
+    from .models import db, Bracket
+
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    for entrants in sizes:
+        started = time.perf_counter()
+        rows = generate("single_elimination", range(1, entrants + 1))
+        computed = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(Bracket.__table__.insert(), [{**row, "tournament_id": entrants} for row in rows])
+        inserted = time.perf_counter()
+        print(
+            f"{entrants:>6} entrants  {len(rows):>6} matches  "
+            f"compute {(computed - started) * 1000:7.2f} ms  "
+            f"insert {(inserted - computed) * 1000:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
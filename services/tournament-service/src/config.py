@@ -3,6 +3,8 @@ import os
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "tournament-service-secret")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-secret-key")
+    # Shared with the API gateway to trust the claims it has already verified
+    INTERNAL_AUTH_SECRET = os.getenv("INTERNAL_AUTH_SECRET", "")
     
     # Build DATABASE_URL from components for better security
     DB_USER = os.getenv("DB_USER", "tournamentuser")
@@ -16,12 +18,56 @@ class Config:
         f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Apply pending schema migrations (src/migrations.py) when the app starts;
+    # disable to run them separately with `python -m src.migrations`
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
     REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+    CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache-invalidation")
     ENV = os.getenv("ENV", "development")
     DEBUG = ENV == "development"
     CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",")]
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRES", "3600"))
     
+    # Tournament listing pages (keyset pagination with ?cursor=)
+    TOURNAMENT_PAGE_SIZE = int(os.getenv("TOURNAMENT_PAGE_SIZE", "50"))
+    TOURNAMENT_MAX_PAGE_SIZE = int(os.getenv("TOURNAMENT_MAX_PAGE_SIZE", "200"))
+
+    # Bulk participant import (POST /<id>/participants/import)
+    PARTICIPANT_IMPORT_BATCH_SIZE = int(os.getenv("PARTICIPANT_IMPORT_BATCH_SIZE", "500"))
+    PARTICIPANT_IMPORT_MAX_ROWS = int(os.getenv("PARTICIPANT_IMPORT_MAX_ROWS", "20000"))
+
+    # Leaderboard points and the Redis sorted set that ranks them. The set is
+    # rebuilt from the leaderboard_entries table at least every
+    # LEADERBOARD_REBUILD_SECONDS in case an update failed to reach Redis.
+    LEADERBOARD_POINTS_PER_WIN = int(os.getenv("LEADERBOARD_POINTS_PER_WIN", "3"))
+    LEADERBOARD_POINTS_PER_TITLE = int(os.getenv("LEADERBOARD_POINTS_PER_TITLE", "10"))
+    LEADERBOARD_POINTS_PER_TOURNAMENT = int(os.getenv("LEADERBOARD_POINTS_PER_TOURNAMENT", "1"))
+    LEADERBOARD_KEY = os.getenv("LEADERBOARD_KEY", "leaderboard:points")
+    LEADERBOARD_REBUILD_SECONDS = int(os.getenv("LEADERBOARD_REBUILD_SECONDS", "3600"))
+    LEADERBOARD_PAGE_SIZE = int(os.getenv("LEADERBOARD_PAGE_SIZE", "50"))
+    LEADERBOARD_MAX_PAGE_SIZE = int(os.getenv("LEADERBOARD_MAX_PAGE_SIZE", "500"))
+
+    # Local replica of the user directory behind /available-users, filled at
+    # startup when empty. One process per deployment (an advisory lock picks
+    # it) applies change events from USER_EVENTS_CHANNEL and pulls
+    # user-service's change feed after reconnecting and every
+    # USER_DIRECTORY_SYNC_SECONDS to pick up anything the events missed.
+    USER_DIRECTORY_SYNC_ENABLED = os.getenv("USER_DIRECTORY_SYNC_ENABLED", "true").lower() == "true"
+    USER_EVENTS_CHANNEL = os.getenv("USER_EVENTS_CHANNEL", "user-events")
+    USER_DIRECTORY_SYNC_SECONDS = int(os.getenv("USER_DIRECTORY_SYNC_SECONDS", "300"))
+    USER_DIRECTORY_SYNC_BATCH_SIZE = int(os.getenv("USER_DIRECTORY_SYNC_BATCH_SIZE", "500"))
+    USER_DIRECTORY_PAGE_SIZE = int(os.getenv("USER_DIRECTORY_PAGE_SIZE", "50"))
+    USER_DIRECTORY_MAX_PAGE_SIZE = int(os.getenv("USER_DIRECTORY_MAX_PAGE_SIZE", "200"))
+
     # Service discovery
     USER_SERVICE_URL = os.getenv("USER_SERVICE_URL", "http://user-service:8002")
     NOTIFICATION_SERVICE_URL = os.getenv("NOTIFICATION_SERVICE_URL", "http://notification-service:8004")
+
+    # Tracing: W3C traceparent and X-Request-ID propagation, spans exported as
+    # JSON lines to TRACE_EXPORT_PATH and/or POSTed to TRACE_COLLECTOR_URL
+    SERVICE_NAME = os.getenv("SERVICE_NAME", "tournament-service")
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+    TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+    TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
@@ -0,0 +1,261 @@
+"""Materialized leaderboard
+
+Standings live in the leaderboard_entries table and are updated in the same
+transaction as the results that change them. Points are mirrored into a Redis
+sorted set so top-N pages and a user's rank are O(log n); when Redis is
+unavailable the table answers instead.
+"""
+import logging
+from collections import Counter, defaultdict
+from sqlalchemy import func
+from .config import Config
+from .events import get_redis
+from .models import db, Bracket, LeaderboardEntry, Participant
+from .bracket_engine import BYE_SCORE
+
+STAT_COLUMNS = ["points", "matches_played", "wins", "losses", "tournaments_played", "tournament_wins"]
+
+
+def new_deltas():
+    """participant id -> Counter of stat changes"""
+    return defaultdict(Counter)
+
+
+def add_match(deltas, winner_id, loser_id, sign=1):
+    """Count a played match; sign=-1 takes back a result that was overwritten"""
+    deltas[winner_id].update({"wins": sign, "matches_played": sign, "points": sign * Config.LEADERBOARD_POINTS_PER_WIN})
+    deltas[loser_id].update({"losses": sign, "matches_played": sign})
+
+
+def add_title(deltas, champion_id, sign=1):
+    deltas[champion_id].update({"tournament_wins": sign, "points": sign * Config.LEADERBOARD_POINTS_PER_TITLE})
+
+
+def add_completed_tournament(deltas, tournament_id, sign=1):
+    """Count a finished tournament for everyone who was drawn into its bracket"""
+    first_round = Bracket.query.with_entities(Bracket.participant1_id, Bracket.participant2_id).filter_by(
+        tournament_id=tournament_id, round=1
+    )
+    for row in first_round:
+        for participant_id in row:
+            if participant_id is not None:
+                deltas[participant_id].update(
+                    {"tournaments_played": sign, "points": sign * Config.LEADERBOARD_POINTS_PER_TOURNAMENT}
+                )
+
+
+def opponent(match, participant_id):
+    return match.participant2_id if participant_id == match.participant1_id else match.participant1_id
+
+
+def add_result(deltas, match, tournament, winner_id):
+    """Changes for recording winner_id on a match, replacing any earlier result
+
+    Call before the match and tournament are updated.
+    """
+    if match.winner_id is not None:
+        add_match(deltas, match.winner_id, opponent(match, match.winner_id), -1)
+    add_match(deltas, winner_id, opponent(match, winner_id))
+    if match.is_final:
+        if tournament.status == "completed":
+            add_title(deltas, match.winner_id, -1)
+        else:
+            add_completed_tournament(deltas, tournament.id)
+        add_title(deltas, winner_id)
+
+
+def add_bracket(deltas, tournament, sign=1):
+    """Everything a tournament's bracket contributed, e.g. to take it all back"""
+    matches = Bracket.query.filter(Bracket.tournament_id == tournament.id, Bracket.winner_id.isnot(None))
+    for match in matches:
+        if match.score == BYE_SCORE:
+            continue
+        add_match(deltas, match.winner_id, opponent(match, match.winner_id), sign)
+        if match.is_final:
+            add_title(deltas, match.winner_id, sign)
+    if tournament.status == "completed":
+        add_completed_tournament(deltas, tournament.id, sign)
+
+
+def apply(deltas):
+    """Fold participant deltas into the users' entries; returns the user ids touched
+
+    Runs inside the caller's transaction as one upsert. Guest participants
+    without a user account are not ranked.
+    """
+    participant_ids = [pid for pid, counts in deltas.items() if pid is not None and any(counts.values())]
+    if not participant_ids:
+        return []
+    participants = db.session.query(Participant.id, Participant.user_id, Participant.name).filter(
+        Participant.id.in_(participant_ids)
+    )
+
+    by_user = {}
+    for participant_id, user_id, name in participants:
+        if user_id is None:
+            continue
+        row = by_user.setdefault(user_id, {"user_id": user_id, "user_name": name, **dict.fromkeys(STAT_COLUMNS, 0)})
+        for column, change in deltas[participant_id].items():
+            row[column] += change
+    if not by_user:
+        return []
+
+    table = LeaderboardEntry.__table__
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={
+            "user_name": statement.excluded.user_name,
+            "updated_at": func.now(),
+            **{column: table.c[column] + statement.excluded[column] for column in STAT_COLUMNS},
+        },
+    )
+    db.session.execute(statement, list(by_user.values()))
+
+    # Users whose only results were taken back drop off the board
+    LeaderboardEntry.query.filter(
+        LeaderboardEntry.user_id.in_(list(by_user)),
+        LeaderboardEntry.matches_played <= 0,
+        LeaderboardEntry.tournaments_played <= 0,
+    ).delete(synchronize_session=False)
+    return list(by_user)
+
+
+def publish(user_ids):
+    """Copy the committed points of these users into the sorted set"""
+    if not user_ids:
+        return
+    try:
+        client = get_redis()
+        if not client.exists(Config.LEADERBOARD_KEY):
+            rebuild_ranks()
+            return
+        points = db.session.query(LeaderboardEntry.user_id, LeaderboardEntry.points).filter(
+            LeaderboardEntry.user_id.in_(user_ids)
+        )
+        points = dict(points)
+        pipe = client.pipeline()
+        if points:
+            pipe.zadd(Config.LEADERBOARD_KEY, {str(user_id): score for user_id, score in points.items()})
+        removed = [str(user_id) for user_id in user_ids if user_id not in points]
+        if removed:
+            pipe.zrem(Config.LEADERBOARD_KEY, *removed)
+        pipe.execute()
+    except Exception as e:
+        # The set expires and is rebuilt from the table, so this heals itself
+        logging.warning(f"Failed to update leaderboard ranks: {str(e)}")
+
+
+def rebuild_ranks():
+    """Replace the sorted set with the points in the table"""
+    client = get_redis()
+    staging = f"{Config.LEADERBOARD_KEY}:rebuild"
+    pipe = client.pipeline()
+    pipe.delete(staging)
+    batch = {}
+    for user_id, score in db.session.query(LeaderboardEntry.user_id, LeaderboardEntry.points).yield_per(5000):
+        batch[str(user_id)] = score
+        if len(batch) >= 5000:
+            pipe.zadd(staging, batch)
+            batch = {}
+    if batch:
+        pipe.zadd(staging, batch)
+    # An empty table leaves no staging key, so park a placeholder to rename
+    pipe.zadd(staging, {"": float("-inf")})
+    pipe.rename(staging, Config.LEADERBOARD_KEY)
+    pipe.zrem(Config.LEADERBOARD_KEY, "")
+    pipe.expire(Config.LEADERBOARD_KEY, Config.LEADERBOARD_REBUILD_SECONDS)
+    pipe.execute()
+
+
+def _ranked_ids(offset, limit):
+    """(user ids with competition ranks, total) from Redis; ties share a rank"""
+    client = get_redis()
+    if not client.exists(Config.LEADERBOARD_KEY):
+        rebuild_ranks()
+    total = client.zcard(Config.LEADERBOARD_KEY)
+    page = client.zrevrange(Config.LEADERBOARD_KEY, offset, offset + limit - 1, withscores=True)
+    ranked = []
+    previous_score, rank = None, None
+    for position, (member, score) in enumerate(page):
+        if rank is None:
+            # Everyone with more points is ahead, including ties before this page
+            rank = client.zcount(Config.LEADERBOARD_KEY, f"({score}", "+inf") + 1
+        elif score != previous_score:
+            rank = offset + position + 1
+        previous_score = score
+        ranked.append((int(member), rank))
+    return ranked, total
+
+
+def top(offset, limit):
+    """One page of standings, best first; returns (entries, total players)"""
+    try:
+        ranked, total = _ranked_ids(offset, limit)
+        entries = {
+            entry.user_id: entry
+            for entry in LeaderboardEntry.query.filter(LeaderboardEntry.user_id.in_([uid for uid, _ in ranked]))
+        }
+        return [entries[uid].to_dict(rank) for uid, rank in ranked if uid in entries], total
+    except Exception as e:
+        logging.warning(f"Leaderboard ranks unavailable, reading from the table: {str(e)}")
+
+    total = db.session.query(func.count(LeaderboardEntry.user_id)).scalar()
+    page = (
+        LeaderboardEntry.query.order_by(LeaderboardEntry.points.desc(), LeaderboardEntry.user_id.desc())
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+    result, previous_points, rank = [], None, None
+    for position, entry in enumerate(page):
+        if rank is None:
+            rank = rank_of(entry.points)
+        elif entry.points != previous_points:
+            rank = offset + position + 1
+        previous_points = entry.points
+        result.append(entry.to_dict(rank))
+    return result, total
+
+
+def rank_of(points):
+    """Competition rank of a score from the table's points index"""
+    return db.session.query(func.count(LeaderboardEntry.user_id)).filter(LeaderboardEntry.points > points).scalar() + 1
+
+
+def standing(user_id):
+    """The user's entry with their rank, or None when they have not played"""
+    entry = db.session.get(LeaderboardEntry, user_id)
+    if entry is None:
+        return None
+    try:
+        client = get_redis()
+        if not client.exists(Config.LEADERBOARD_KEY):
+            rebuild_ranks()
+        score = client.zscore(Config.LEADERBOARD_KEY, str(user_id))
+        if score is not None:
+            return entry.to_dict(client.zcount(Config.LEADERBOARD_KEY, f"({score}", "+inf") + 1)
+    except Exception as e:
+        logging.warning(f"Leaderboard ranks unavailable, reading from the table: {str(e)}")
+    return entry.to_dict(rank_of(entry.points))
+
+
+def rebuild_table():
+    """Recompute every entry from recorded matches; run by migration 7 and to repair standings"""
+    from .models import Tournament
+
+    deltas = new_deltas()
+    for tournament in Tournament.query.all():
+        add_bracket(deltas, tournament)
+    LeaderboardEntry.query.delete()
+    user_ids = apply(deltas)
+    db.session.commit()
+    try:
+        rebuild_ranks()
+    except Exception as e:
+        logging.warning(f"Failed to rebuild leaderboard ranks: {str(e)}")
+    return len(user_ids)
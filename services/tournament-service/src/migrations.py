@@ -0,0 +1,188 @@
+"""Versioned schema migrations
+
+Each migration runs once per database, in version order, and is recorded in
+the schema_migrations table. On PostgreSQL an advisory lock stops replicas
+that start together from migrating at the same time, and indexes are built
+with CREATE INDEX CONCURRENTLY so the table stays writable while they build.
+
+Migrations must be safe to run against a database that already has the
+change, since databases created before this module existed have no record
+of what was applied.
+"""
+import logging
+from sqlalchemy import inspect, text
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_lock key, shared by every replica of this service
+LOCK_ID = 72_003
+
+MIGRATIONS = []
+
+
+def migration(version, transactional=True):
+    """Register a migration; non-transactional ones run in autocommit mode,
+    which CREATE INDEX CONCURRENTLY requires"""
+    def register(upgrade):
+        MIGRATIONS.append({"version": version, "name": upgrade.__name__, "upgrade": upgrade, "transactional": transactional})
+        return upgrade
+    return register
+
+
+def add_column(conn, table, column, ddl):
+    """Add a column unless it exists; returns True when it was added"""
+    if column in {c["name"] for c in inspect(conn).get_columns(table)}:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return True
+
+
+def create_index(conn, name, table, columns, unique=False):
+    """Create an index unless it exists, concurrently on PostgreSQL"""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if conn.dialect.name != "postgresql":
+        conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+        return
+
+    # An interrupted concurrent build leaves an invalid index behind that
+    # IF NOT EXISTS would skip, so drop it and build again
+    valid = conn.execute(
+        text("SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"),
+        {"name": name},
+    ).scalar()
+    if valid is False:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+@migration(1)
+def create_tables(conn):
+    db.metadata.create_all(bind=conn)
+
+
+@migration(2)
+def add_participant_status(conn):
+    add_column(conn, "participants", "status", "VARCHAR(50) DEFAULT 'approved' NOT NULL")
+
+
+@migration(3)
+def add_bracket_match_graph(conn):
+    if add_column(conn, "brackets", "next_match_number", "INTEGER"):
+        add_column(conn, "brackets", "next_slot", "SMALLINT")
+        add_column(conn, "brackets", "is_final", "BOOLEAN DEFAULT FALSE NOT NULL")
+        add_column(conn, "brackets", "version", "INTEGER DEFAULT 1 NOT NULL")
+        # Derive the links for brackets generated before they existed
+        conn.execute(text(
+            "UPDATE brackets SET is_final = TRUE WHERE round = "
+            "(SELECT MAX(b.round) FROM brackets b WHERE b.tournament_id = brackets.tournament_id)"
+        ))
+        conn.execute(text(
+            "UPDATE brackets SET next_match_number = (match_number + 1) / 2, "
+            "next_slot = 2 - match_number % 2 WHERE is_final = FALSE"
+        ))
+
+
+@migration(4)
+def add_tournament_approved_count(conn):
+    if add_column(conn, "tournaments", "approved_count", "INTEGER DEFAULT 0 NOT NULL"):
+        conn.execute(text(
+            "UPDATE tournaments SET approved_count = (SELECT COUNT(*) FROM participants p "
+            "WHERE p.tournament_id = tournaments.id AND p.status = 'approved')"
+        ))
+
+
+@migration(5, transactional=False)
+def add_hot_path_indexes(conn):
+    # Registration duplicate checks and approved participant lookups
+    create_index(conn, "ix_participants_tournament_user", "participants", ["tournament_id", "user_id"])
+    create_index(conn, "ix_participants_tournament_status", "participants", ["tournament_id", "status"])
+    # Bracket reads in play order and winner advancement
+    create_index(conn, "ix_brackets_tournament_round_match", "brackets", ["tournament_id", "round", "match_number"], unique=True)
+    # Tournament listing filters and keyset order
+    create_index(conn, "ix_tournaments_status_start_date", "tournaments", ["status", "start_date", "id"])
+    create_index(conn, "ix_tournaments_start_date", "tournaments", ["start_date", "id"])
+    # Leaderboard pages and ranks when Redis is unavailable
+    create_index(conn, "ix_leaderboard_entries_points", "leaderboard_entries", ["points", "user_id"])
+
+
+@migration(6)
+def create_user_directory(conn):
+    from .models import DirectoryUser, SyncCursor
+
+    # New tables, so their indexes are built while they are still empty
+    DirectoryUser.__table__.create(bind=conn, checkfirst=True)
+    SyncCursor.__table__.create(bind=conn, checkfirst=True)
+
+
+@migration(7, transactional=False)
+def rebuild_leaderboard(conn):
+    from . import leaderboard
+
+    # Standings for results recorded before leaderboard_entries existed;
+    # without them later -1 corrections would leave negative rows. The
+    # rebuild commits through the session and can safely run again if
+    # recording this step fails.
+    leaderboard.rebuild_table()
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, "
+            "applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL)"
+        ))
+        return {version for (version,) in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def migrate(engine):
+    """Apply pending migrations in order; returns the versions applied"""
+    postgres = engine.dialect.name == "postgresql"
+    with engine.connect() as lock:
+        if postgres:
+            lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": LOCK_ID})
+            lock.commit()
+        try:
+            applied = applied_versions(engine)
+            done = []
+            for step in sorted(MIGRATIONS, key=lambda m: m["version"]):
+                if step["version"] in applied:
+                    continue
+                logger.info(f"Applying migration {step['version']} {step['name']}")
+                if step["transactional"]:
+                    with engine.begin() as conn:
+                        step["upgrade"](conn)
+                        _record(conn, step)
+                else:
+                    with engine.connect() as conn:
+                        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                        step["upgrade"](conn)
+                        _record(conn, step)
+                done.append(step["version"])
+            return done
+        finally:
+            if postgres:
+                lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": LOCK_ID})
+                lock.commit()
+
+
+def _record(conn, step):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+        {"version": step["version"], "name": step["name"]},
+    )
+
+
+if __name__ == "__main__":
+    from flask import Flask
+    from .config import Config
+
+    # Only the database; create_app would migrate (and seed) on its own
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    with app.app_context():
+        applied = migrate(db.engine)
+        latest = max(applied_versions(db.engine), default=0)
+        print(f"Applied {len(applied)} migrations; database is at version {latest}")
@@ -1,4 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import update
 from sqlalchemy.sql import func
 
 db = SQLAlchemy()
@@ -13,21 +14,21 @@ class Tournament(db.Model):
     max_participants = db.Column(db.Integer, nullable=False)
     tournament_type = db.Column(db.String(50), default="single_elimination", nullable=False)
     status = db.Column(db.String(50), default="setup", nullable=False)
+    # Approved participants, kept in step by reserve_spots() so capacity is
+    # checked and taken in one conditional UPDATE
+    approved_count = db.Column(db.Integer, default=0, nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     participants = db.relationship("Participant", back_populates="tournament", cascade="all, delete-orphan")
     brackets = db.relationship("Bracket", back_populates="tournament", cascade="all, delete-orphan")
 
+    # Back the listing's status/start_date filters and its (start_date, id) keyset order
+    __table_args__ = (
+        db.Index("ix_tournaments_status_start_date", "status", "start_date", "id"),
+        db.Index("ix_tournaments_start_date", "start_date", "id"),
+    )
+
     def to_dict(self):
-        # Count only approved participants
-        # Use getattr to safely handle cases where status column might not exist yet
-        try:
-            participants_list = self.participants or []
-            approved_count = sum(1 for p in participants_list if getattr(p, 'status', 'approved') == "approved")
-        except Exception:
-            # If there's any issue accessing participants, default to 0
-            approved_count = 0
-        
         return {
             "id": self.id,
             "name": self.name,
@@ -36,7 +37,7 @@ class Tournament(db.Model):
             "tournament_type": self.tournament_type,
             "status": self.status,
             "created_at": self.created_at.isoformat() if self.created_at else None,
-            "participant_count": approved_count,
+            "participant_count": self.approved_count,
         }
 
 class Participant(db.Model):
@@ -53,6 +54,11 @@ class Participant(db.Model):
 
     tournament = db.relationship("Tournament", back_populates="participants")
 
+    __table_args__ = (
+        db.Index("ix_participants_tournament_user", "tournament_id", "user_id"),
+        db.Index("ix_participants_tournament_status", "tournament_id", "status"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -76,6 +82,12 @@ class Bracket(db.Model):
     participant2_id = db.Column(db.Integer, db.ForeignKey("participants.id"), nullable=True)
     winner_id = db.Column(db.Integer, db.ForeignKey("participants.id"), nullable=True)
     score = db.Column(db.String(50), nullable=True)
+    # Where the winner goes: match next_match_number of the next round, slot 1 or 2
+    next_match_number = db.Column(db.Integer, nullable=True)
+    next_slot = db.Column(db.SmallInteger, nullable=True)
+    is_final = db.Column(db.Boolean, default=False, nullable=False)
+    # Bumped on every change; stale writes fail instead of overwriting
+    version = db.Column(db.Integer, default=1, nullable=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     tournament = db.relationship("Tournament", back_populates="brackets")
@@ -83,6 +95,11 @@ class Bracket(db.Model):
     participant2 = db.relationship("Participant", foreign_keys=[participant2_id])
     winner = db.relationship("Participant", foreign_keys=[winner_id])
 
+    __table_args__ = (
+        db.Index("ix_brackets_tournament_round_match", "tournament_id", "round", "match_number", unique=True),
+    )
+    __mapper_args__ = {"version_id_col": version}
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -94,39 +111,109 @@ class Bracket(db.Model):
             "winner_id": self.winner_id,
             "winner": self.winner.to_dict() if self.winner else None,
             "score": self.score,
+            "next_match_number": self.next_match_number,
+            "next_slot": self.next_slot,
+            "is_final": self.is_final,
+            "version": self.version,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
 
+    # Column order of Bracket.to_row(), sent once per compact bracket response
+    ROW_FIELDS = [
+        "id", "round", "match_number", "participant1_id", "participant2_id", "winner_id", "score",
+        "next_match_number", "next_slot", "is_final", "version",
+    ]
+
+    def to_row(self):
+        """Compact form referencing participants by id"""
+        return [getattr(self, field) for field in self.ROW_FIELDS]
+
+class LeaderboardEntry(db.Model):
+    """Standings of one user across every tournament, kept up to date as results are recorded"""
+    __tablename__ = "leaderboard_entries"
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_name = db.Column(db.String(255), nullable=False)
+    points = db.Column(db.Integer, default=0, nullable=False)
+    matches_played = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    losses = db.Column(db.Integer, default=0, nullable=False)
+    tournaments_played = db.Column(db.Integer, default=0, nullable=False)
+    tournament_wins = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_leaderboard_entries_points", "points", "user_id"),
+    )
+
+    def to_dict(self, rank=None):
+        return {
+            "rank": rank,
+            "user_id": self.user_id,
+            "user_name": self.user_name,
+            "points": self.points,
+            "matches_played": self.matches_played,
+            "total_wins": self.wins,
+            "total_losses": self.losses,
+            "tournaments_played": self.tournaments_played,
+            "tournament_wins": self.tournament_wins,
+            "win_rate": round(100 * self.wins / self.matches_played) if self.matches_played else 0,
+        }
+
+# Byte-order collation on PostgreSQL so prefix LIKE searches can use the btree
+# index that also serves the (sort_name, id) page order
+SEARCH_KEY = db.String(255).with_variant(db.String(255, collation="C"), "postgresql")
+
+class DirectoryUser(db.Model):
+    """Local replica of a user-service user, kept in sync by user_directory"""
+    __tablename__ = "directory_users"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(255), nullable=False)
+    email = db.Column(SEARCH_KEY, nullable=False)
+    # Lower-cased name for case-insensitive prefix search and ordering
+    sort_name = db.Column(SEARCH_KEY, nullable=False)
+    is_approved = db.Column(db.Boolean, default=False, nullable=False)
+    is_banned = db.Column(db.Boolean, default=False, nullable=False)
+    is_deleted = db.Column(db.Boolean, default=False, nullable=False)
+    # user-service's updated_at (or deleted_at); older changes never overwrite newer ones
+    source_updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_directory_users_sort_name", "sort_name", "id"),
+        db.Index("ix_directory_users_email", "email"),
+    )
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "email": self.email}
+
+class SyncCursor(db.Model):
+    """How far a replica has read another service's change feed"""
+    __tablename__ = "sync_cursors"
+
+    name = db.Column(db.String(64), primary_key=True)
+    cursor = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+def reserve_spots(tournament_id, count=1):
+    """Take count approved spots in a tournament, or none if it would overfill
+
+    A single conditional UPDATE on the tournament row; the row stays locked
+    until the caller's transaction ends, so concurrent sign-ups queue on it
+    rather than each passing a stale count check.
+    """
+    result = db.session.execute(
+        update(Tournament)
+        .where(Tournament.id == tournament_id, Tournament.approved_count + count <= Tournament.max_participants)
+        .values(approved_count=Tournament.approved_count + count)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
 def init_db(app):
-    """Initialize database"""
+    """Initialize database and apply pending schema migrations"""
     db.init_app(app)
-    with app.app_context():
-        db.create_all()
-        
-        # Migrate existing databases: Add status column to participants if it doesn't exist
-        try:
-            from sqlalchemy import text, inspect
-            
-            inspector = inspect(db.engine)
-            
-            # Check if participants table exists
-            if 'participants' in inspector.get_table_names():
-                # Get existing columns
-                existing_columns = [col['name'] for col in inspector.get_columns('participants')]
-                
-                # Add status column if it doesn't exist
-                if 'status' not in existing_columns:
-                    with db.engine.connect() as conn:
-                        # Use transaction
-                        trans = conn.begin()
-                        try:
-                            conn.execute(text(
-                                "ALTER TABLE participants ADD COLUMN status VARCHAR(50) DEFAULT 'approved' NOT NULL"
-                            ))
-                            trans.commit()
-                            print("✓ Added 'status' column to participants table")
-                        except Exception as e:
-                            trans.rollback()
-                            print(f"Warning: Could not add status column: {e}")
-        except Exception as e:
-            print(f"Warning: Database migration check failed: {e}")
+    if app.config.get("MIGRATE_ON_STARTUP", True):
+        from .migrations import migrate
+        with app.app_context():
+            migrate(db.engine)
@@ -0,0 +1,119 @@
+"""Bulk participant import from JSON, CSV or NDJSON
+
+Rows are read from the request stream as they arrive, checked against a
+single set of already registered users, and inserted in batches inside one
+transaction. Every row gets an outcome in the report.
+"""
+import csv
+import io
+import json
+from .config import Config
+from .models import db, Participant, Tournament
+
+# Per-row outcomes
+ADDED = "added"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+FULL = "full"
+
+
+class ImportTooLarge(Exception):
+    """More rows than PARTICIPANT_IMPORT_MAX_ROWS"""
+
+
+def read_rows(mimetype, stream, get_json):
+    """Yield raw rows (dicts) from the request body in its content type"""
+    if mimetype == "text/csv":
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+        yield from reader
+    elif mimetype in ("application/x-ndjson", "application/jsonl"):
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+    else:
+        payload = get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get("participants")
+        if not isinstance(payload, list):
+            raise ValueError("Expected a JSON array of participants or {\"participants\": [...]}")
+        yield from payload
+
+
+def _optional_int(value):
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def clean_row(raw):
+    """(participant values, None) or (None, why the row is invalid)"""
+    if not isinstance(raw, dict):
+        return None, "Row is not an object"
+    name = (raw.get("name") or "").strip()
+    if not name:
+        return None, "name is required"
+    try:
+        user_id = _optional_int(raw.get("user_id"))
+        seed = _optional_int(raw.get("seed"))
+    except (TypeError, ValueError):
+        return None, "user_id and seed must be integers"
+    return {"name": name[:255], "user_id": user_id, "seed": seed}, None
+
+
+def import_participants(tournament_id, rows):
+    """Add approved participants from rows; returns (summary counts, per-row results)
+
+    The caller commits. The tournament row is locked for the whole import, so
+    capacity is checked in memory and the counter is updated once at the end.
+    """
+    tournament = Tournament.query.filter_by(id=tournament_id).with_for_update().one()
+    remaining = tournament.max_participants - tournament.approved_count
+
+    # Everyone already registered, pending or approved, in one query
+    registered = {
+        user_id
+        for (user_id,) in db.session.query(Participant.user_id).filter(
+            Participant.tournament_id == tournament_id, Participant.user_id.isnot(None)
+        )
+    }
+
+    results = []
+    batch = []
+    added = 0
+    table = Participant.__table__
+    for number, raw in enumerate(rows, 1):
+        if number > Config.PARTICIPANT_IMPORT_MAX_ROWS:
+            raise ImportTooLarge()
+        values, error = clean_row(raw)
+        if error:
+            results.append({"row": number, "status": INVALID, "detail": error})
+            continue
+        if values["user_id"] is not None and values["user_id"] in registered:
+            results.append({"row": number, "status": DUPLICATE, "name": values["name"]})
+            continue
+        if added + len(batch) >= remaining:
+            results.append({"row": number, "status": FULL, "name": values["name"]})
+            continue
+
+        if values["user_id"] is not None:
+            registered.add(values["user_id"])
+        batch.append({**values, "tournament_id": tournament_id, "status": "approved"})
+        results.append({"row": number, "status": ADDED, "name": values["name"]})
+        if len(batch) >= Config.PARTICIPANT_IMPORT_BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            added += len(batch)
+            batch = []
+
+    if batch:
+        db.session.execute(table.insert(), batch)
+        added += len(batch)
+    tournament.approved_count += added
+
+    summary = {status: 0 for status in (ADDED, DUPLICATE, INVALID, FULL)}
+    for result in results:
+        summary[result["status"]] += 1
+    return summary, results
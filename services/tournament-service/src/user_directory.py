@@ -0,0 +1,295 @@
+"""Local replica of the user directory
+
+user-service publishes every user change on USER_EVENTS_CHANNEL and keeps a
+change feed (GET /api/users/changes) with tombstones for deleted users. One
+process per deployment, elected with a PostgreSQL advisory lock, applies the
+events as they arrive and pulls the feed from its stored cursor when it
+starts, after reconnecting to Redis and periodically, so the participant
+picker is answered from the directory_users table alone.
+"""
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+import redis
+from sqlalchemy import bindparam, text, tuple_, update
+from .config import Config
+from .http_client import http
+from .internal_auth import service_headers
+from .models import db, DirectoryUser, SyncCursor
+
+logger = logging.getLogger(__name__)
+
+# SyncCursor row for user-service's change feed
+FEED = "user-service/users"
+
+
+def to_row(user):
+    """directory_users values from a user as published by user-service"""
+    name = user.get("full_name") or user["email"]
+    return {
+        "id": user["id"],
+        "name": name,
+        "email": user["email"].lower(),
+        "sort_name": name.lower(),
+        "is_approved": bool(user.get("is_approved")),
+        "is_banned": bool(user.get("is_banned")),
+        "is_deleted": False,
+        "source_updated_at": datetime.fromisoformat(user["updated_at"]),
+    }
+
+
+def apply_users(users):
+    """Upsert changed users, skipping any change older than the stored one"""
+    if not users:
+        return
+    table = DirectoryUser.__table__
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={column.name: statement.excluded[column.name] for column in table.columns if column.name != "id"},
+        where=table.c.source_updated_at <= statement.excluded.source_updated_at,
+    )
+    db.session.execute(statement, [to_row(user) for user in users])
+
+
+def apply_deleted(tombstones):
+    """Mark deleted users; the row stays so a late, older change cannot revive it"""
+    if not tombstones:
+        return
+    table = DirectoryUser.__table__
+    db.session.execute(
+        update(table)
+        .where(table.c.id == bindparam("user_id"), table.c.source_updated_at <= bindparam("deleted_at"))
+        .values(is_deleted=True, source_updated_at=bindparam("deleted_at")),
+        [{"user_id": t["id"], "deleted_at": datetime.fromisoformat(t["deleted_at"])} for t in tombstones],
+    )
+
+
+def apply_event(event):
+    """Apply one message from USER_EVENTS_CHANNEL and commit"""
+    if event.get("type") == "user.changed":
+        apply_users([event["user"]])
+    elif event.get("type") == "user.deleted":
+        apply_deleted([event["user"]])
+    else:
+        return
+    db.session.commit()
+
+
+def sync():
+    """Pull the change feed from the stored cursor to the end; returns rows applied"""
+    headers = service_headers()
+    if headers is None:
+        raise RuntimeError("INTERNAL_AUTH_SECRET is required to read the user change feed")
+    state = db.session.get(SyncCursor, FEED)
+    cursor = state.cursor if state else None
+    applied = 0
+    while True:
+        params = {"limit": Config.USER_DIRECTORY_SYNC_BATCH_SIZE}
+        if cursor:
+            params["cursor"] = cursor
+        response = http.get(f"{Config.USER_SERVICE_URL}/api/users/changes", params=params, headers=headers, timeout=10)
+        response.raise_for_status()
+        page = response.json()
+
+        apply_users(page["users"])
+        apply_deleted(page["deleted"])
+        cursor = page["next_cursor"]
+        # The cursor moves in the same transaction as the rows it covers
+        db.session.merge(SyncCursor(name=FEED, cursor=cursor))
+        db.session.commit()
+        applied += len(page["users"]) + len(page["deleted"])
+        if not page["has_more"]:
+            return applied
+
+
+def encode_cursor(sort_name, user_id):
+    """Opaque cursor pointing just past the given row in name order"""
+    raw = json.dumps([sort_name, user_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Return (sort_name, id) from a cursor, or None when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_name, user_id = json.loads(raw)
+        return str(sort_name), int(user_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _prefix(column, text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return column.like(f"{escaped}%", escape="\\")
+
+
+def search(text, limit, after=None):
+    """Approved, non-banned users whose name or email starts with text, in name order
+
+    Returns (users, next cursor or None).
+    """
+    query = DirectoryUser.query.filter(
+        DirectoryUser.is_approved.is_(True),
+        DirectoryUser.is_banned.is_(False),
+        DirectoryUser.is_deleted.is_(False),
+    )
+    text = (text or "").strip().lower()
+    if text:
+        query = query.filter(db.or_(_prefix(DirectoryUser.sort_name, text), _prefix(DirectoryUser.email, text)))
+    if after is not None:
+        query = query.filter(tuple_(DirectoryUser.sort_name, DirectoryUser.id) > tuple_(*after))
+
+    # Fetch one extra row to learn whether another page follows
+    users = query.order_by(DirectoryUser.sort_name, DirectoryUser.id).limit(limit + 1).all()
+    next_cursor = encode_cursor(users[limit - 1].sort_name, users[limit - 1].id) if len(users) > limit else None
+    return users[:limit], next_cursor
+
+
+# pg_advisory_lock keys: one held for as long as a process is the
+# deployment's syncer, one taken briefly while filling an empty replica
+SYNC_LOCK_ID = 72_013
+FILL_LOCK_ID = 72_014
+LEADER_RETRY_SECONDS = 30
+
+
+def initial_sync(app):
+    """Fill an empty replica before serving, so a fresh deploy's picker is not blank
+
+    Pods starting together take turns; the first one fills the table and the
+    rest find it populated. Failures are logged and startup carries on.
+    """
+    with app.app_context():
+        try:
+            with db.engine.connect() as lock:
+                if lock.dialect.name == "postgresql":
+                    lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": FILL_LOCK_ID})
+                    lock.commit()
+                try:
+                    if db.session.query(DirectoryUser.id).first() is None:
+                        logger.info(f"Filled the user directory with {sync()} users from user-service")
+                finally:
+                    if lock.dialect.name == "postgresql":
+                        lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": FILL_LOCK_ID})
+                        lock.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Initial user directory sync failed: {e}")
+        finally:
+            db.session.remove()
+
+
+# Every worker starts a listener thread, but only the one holding
+# SYNC_LOCK_ID subscribes and pulls the feed; the others wait to take over
+# if its connection goes away.
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener(app):
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        thread = threading.Thread(target=_listen, args=(app,), daemon=True)
+        thread.start()
+
+
+def _catch_up(app):
+    with app.app_context():
+        try:
+            applied = sync()
+            if applied:
+                logger.info(f"Applied {applied} user directory changes from user-service")
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"User directory sync failed: {e}")
+        finally:
+            db.session.remove()
+
+
+def _listen(app):
+    """Wait to become the syncer, then follow user events until the lock is lost"""
+    while True:
+        try:
+            with app.app_context():
+                engine = db.engine
+            # Closing the connection releases the lock for another process
+            with engine.connect() as lock:
+                if lock.dialect.name != "postgresql" or _take_lead(lock):
+                    _follow(app, lock)
+        except Exception as e:
+            logger.warning(f"User directory syncer stopped: {e}")
+        time.sleep(LEADER_RETRY_SECONDS)
+
+
+def _follow(app, lock):
+    """Apply user events, pulling the change feed for anything missed"""
+    backoff = 1
+    while True:
+        pubsub = None
+        try:
+            client = redis.from_url(Config.REDIS_URL)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(Config.USER_EVENTS_CHANNEL)
+            # Anything published while we were disconnected was missed
+            _catch_up(app)
+            synced = time.monotonic()
+            backoff = 1
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message is not None and message["type"] == "message":
+                    with app.app_context():
+                        try:
+                            apply_event(json.loads(message["data"]))
+                        except Exception as e:
+                            # The next pull of the change feed covers it
+                            db.session.rollback()
+                            logger.warning(f"Failed to apply user event: {e}")
+                        finally:
+                            db.session.remove()
+                if time.monotonic() - synced >= Config.USER_DIRECTORY_SYNC_SECONDS:
+                    _check_lock(lock)
+                    _catch_up(app)
+                    synced = time.monotonic()
+        except redis.RedisError as e:
+            logger.warning(f"User event listener disconnected: {e}")
+            # Keep the replica fresh from the feed while Redis is away
+            _check_lock(lock)
+            _catch_up(app)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+        finally:
+            if pubsub is not None:
+                pubsub.close()
+
+
+def _take_lead(lock):
+    """Try to become the deployment's syncer; the lock lasts as long as the connection"""
+    leading = lock.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": SYNC_LOCK_ID}).scalar()
+    lock.commit()
+    return leading
+
+
+def _check_lock(lock):
+    """Raise when the connection holding the syncer lock is gone, and with it the lock"""
+    lock.execute(text("SELECT 1"))
+    lock.commit()
+
+
+if __name__ == "__main__":
+    from .app import create_app
+
+    with create_app().app_context():
+        print(f"Applied {sync()} user directory changes")
@@ -1,11 +1,28 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
 from flask import Blueprint, request, jsonify, current_app as app
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-import requests
-from .models import db, User
+from flask_jwt_extended import get_jwt_identity, get_jwt
+from sqlalchemy import func, literal, tuple_
+from .internal_auth import jwt_required
+from .http_client import http
+from .models import db, User, DeletedUser
 from .config import Config
+from .events import publish_event
 
 users_bp = Blueprint("users", __name__)
 
+@users_bp.after_request
+def publish_cache_invalidation(response):
+    """Tell gateways to drop cached user responses after a successful write"""
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        publish_event(Config.CACHE_INVALIDATION_CHANNEL, {"resource": "users"})
+    return response
+
+def publish_user_changed(user):
+    """Send the committed state of a user to directory replicas"""
+    publish_event(Config.USER_EVENTS_CHANNEL, {"type": "user.changed", "user": user.to_directory()})
+
 def get_current_user_role():
     """Helper to get current user role from JWT"""
     claims = get_jwt()
@@ -25,6 +42,13 @@ def require_admin_or_trainer():
         return jsonify({"detail": "Admin or Trainer access required"}), 403
     return None
 
+def require_admin_or_service():
+    """Helper to check if the caller is an admin or another service"""
+    role = get_current_user_role()
+    if role not in ["admin", "service"]:
+        return jsonify({"detail": "Admin or service access required"}), 403
+    return None
+
 @users_bp.post("/create")
 def create_user():
     """Create user profile - called by auth-service after registration"""
@@ -53,7 +77,10 @@ def create_user():
         is_root_admin=False,
     )
     db.session.add(user)
+    # A returning id is live again
+    DeletedUser.query.filter_by(id=user_id).delete()
     db.session.commit()
+    publish_user_changed(user)
 
     return jsonify({"detail": "User profile created", "user_id": user.id}), 201
 
@@ -137,11 +164,12 @@ def approve_user():
     
     user.is_approved = True
     db.session.commit()
+    publish_user_changed(user)
     
     # Notify auth-service to update approval status
     try:
         auth_service_url = Config.AUTH_SERVICE_URL
-        response = requests.patch(
+        response = http.patch(
             f"{auth_service_url}/api/auth/sync-approval",
             json={
                 "user_id": user_id, 
@@ -181,11 +209,12 @@ def ban_user():
     
     user.is_banned = True
     db.session.commit()
+    publish_user_changed(user)
     
     # Notify auth-service to update ban status
     try:
         auth_service_url = Config.AUTH_SERVICE_URL
-        response = requests.patch(
+        response = http.patch(
             f"{auth_service_url}/api/auth/sync-ban",
             json={"user_id": user_id, "is_banned": True},
             timeout=5
@@ -213,14 +242,17 @@ def delete_user(user_id):
     if user.is_root_admin:
         return jsonify({"detail": "Cannot delete root admin user"}), 403
     
-    # Delete the user
+    # Delete the user, leaving a tombstone for the change feed
     db.session.delete(user)
+    tombstone = DeletedUser(id=user_id)
+    db.session.add(tombstone)
     db.session.commit()
+    publish_event(Config.USER_EVENTS_CHANNEL, {"type": "user.deleted", "user": tombstone.to_directory()})
     
     # Notify auth-service to delete the auth record
     try:
         auth_service_url = Config.AUTH_SERVICE_URL
-        response = requests.delete(
+        response = http.delete(
             f"{auth_service_url}/api/auth/user/{user_id}",
             timeout=5
         )
@@ -231,6 +263,92 @@ def delete_user(user_id):
     
     return jsonify({"detail": "User deleted"}), 200
 
+# Start of the change feed: before any user was stamped
+FEED_START = [datetime(1970, 1, 1, tzinfo=timezone.utc), 0]
+
+def encode_cursor(users_position, deleted_position):
+    """Opaque cursor holding the (timestamp, id) reached in users and in tombstones"""
+    raw = json.dumps([[when.isoformat(), row_id] for when, row_id in (users_position, deleted_position)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Return (users position, tombstones position) from a cursor, or None when it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return tuple([datetime.fromisoformat(when), int(row_id)] for when, row_id in json.loads(raw))
+    except (ValueError, TypeError):
+        return None
+
+@users_bp.get("/changes")
+@jwt_required()
+def list_changes():
+    """Users changed and deleted since a cursor - admin or service
+
+    Replicas follow next_cursor while has_more is true, then keep the last
+    cursor and pass it on their next pull. Without a cursor the feed starts
+    from the beginning, i.e. a full copy.
+    """
+    error = require_admin_or_service()
+    if error:
+        return error
+
+    try:
+        limit = int(request.args.get("limit", Config.USER_CHANGES_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"detail": "limit must be an integer"}), 400
+    limit = max(1, min(limit, Config.USER_CHANGES_MAX_PAGE_SIZE))
+
+    users_after, deleted_after = FEED_START, FEED_START
+    if request.args.get("cursor"):
+        position = decode_cursor(request.args["cursor"])
+        if position is None or len(position) != 2:
+            return jsonify({"detail": "Invalid cursor"}), 400
+        users_after, deleted_after = position
+
+    users = _changes_after(User, User.updated_at, users_after, limit)
+    deleted = _changes_after(DeletedUser, DeletedUser.deleted_at, deleted_after, limit)
+    if users:
+        users_after = [users[-1].updated_at, users[-1].id]
+    if deleted:
+        deleted_after = [deleted[-1].deleted_at, deleted[-1].id]
+
+    has_more = len(users) == limit or len(deleted) == limit
+    if not has_more:
+        # Timestamps come from transaction start, so a slower transaction can
+        # still commit rows behind the newest one read; look back next time
+        settled = [db.session.query(func.now()).scalar() - timedelta(seconds=Config.USER_CHANGES_SETTLE_SECONDS), 0]
+        users_after = min(users_after, settled, key=lambda position: _utc(position[0]))
+        deleted_after = min(deleted_after, settled, key=lambda position: _utc(position[0]))
+
+    return jsonify({
+        "users": [u.to_directory() for u in users],
+        "deleted": [d.to_directory() for d in deleted],
+        "next_cursor": encode_cursor(users_after, deleted_after),
+        "has_more": has_more,
+    }), 200
+
+def _feed_key(timestamp):
+    # SQLite stores CURRENT_TIMESTAMP to the second but binds datetimes with
+    # microseconds, and compares the two as text; normalize both to one format
+    if db.engine.dialect.name == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", timestamp)
+    return timestamp
+
+def _changes_after(model, stamped_at, position, limit):
+    """Up to limit rows past a (timestamp, id) feed position, in feed order"""
+    when, row_id = position
+    key = _feed_key(stamped_at)
+    return (
+        model.query.filter(tuple_(key, model.id) > tuple_(_feed_key(literal(when, stamped_at.type)), row_id))
+        .order_by(key, model.id)
+        .limit(limit)
+        .all()
+    )
+
+def _utc(when):
+    # SQLite hands back naive datetimes
+    return when if when.tzinfo else when.replace(tzinfo=timezone.utc)
+
 @users_bp.get("/health")
 def health():
     """Health check endpoint"""
@@ -2,7 +2,9 @@ from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from .config import Config
-from .models import init_db
+from .models import db, init_db
+from .metrics import init_metrics
+from .tracing import init_tracing
 from .api import users_bp
 
 def create_app():
@@ -19,6 +21,11 @@ def create_app():
     # Database
     init_db(app)
 
+    # Metrics and tracing: per-route latency, outbound calls and query timings
+    with app.app_context():
+        init_metrics(app, db.engine)
+        init_tracing(app, db.engine)
+
     # Register blueprints
     app.register_blueprint(users_bp, url_prefix="/api/users")
 
@@ -3,6 +3,8 @@ import os
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "user-service-secret")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-secret-key")
+    # Shared with the API gateway to trust the claims it has already verified
+    INTERNAL_AUTH_SECRET = os.getenv("INTERNAL_AUTH_SECRET", "")
     
     # Build DATABASE_URL from components for better security
     DB_USER = os.getenv("DB_USER", "useruser")
@@ -16,11 +18,33 @@ class Config:
         f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Apply pending schema migrations (src/migrations.py) when the app starts;
+    # disable to run them separately with `python -m src.migrations`
+    MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() == "true"
     REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+    CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache-invalidation")
+    # Every user change is published here for services that replicate the directory
+    USER_EVENTS_CHANNEL = os.getenv("USER_EVENTS_CHANNEL", "user-events")
     ENV = os.getenv("ENV", "development")
     DEBUG = ENV == "development"
     CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "*").split(",")]
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRES", "3600"))
     
+    # Change feed (GET /changes). Pages that reach the end hold their cursor
+    # USER_CHANGES_SETTLE_SECONDS back, so rows stamped by transactions that
+    # were still in flight are read again on the next pull instead of skipped.
+    USER_CHANGES_PAGE_SIZE = int(os.getenv("USER_CHANGES_PAGE_SIZE", "500"))
+    USER_CHANGES_MAX_PAGE_SIZE = int(os.getenv("USER_CHANGES_MAX_PAGE_SIZE", "2000"))
+    USER_CHANGES_SETTLE_SECONDS = int(os.getenv("USER_CHANGES_SETTLE_SECONDS", "10"))
+
     # Service discovery
     AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://auth-service:8001")
+
+    # Tracing: W3C traceparent and X-Request-ID propagation, spans exported as
+    # JSON lines to TRACE_EXPORT_PATH and/or POSTed to TRACE_COLLECTOR_URL
+    SERVICE_NAME = os.getenv("SERVICE_NAME", "user-service")
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+    TRACE_COLLECTOR_URL = os.getenv("TRACE_COLLECTOR_URL", "")
+    TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
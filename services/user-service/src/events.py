@@ -0,0 +1,23 @@
+import json
+import logging
+import redis
+from .config import Config
+from .tracing import start_span
+
+# Shared Redis client for publishing events, created on first use
+_redis_client = None
+
+def get_redis():
+    """Return the Redis client used for publishing"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.from_url(Config.REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+    return _redis_client
+
+def publish_event(channel, payload):
+    """Publish an event to Redis; failures are logged and never raised"""
+    try:
+        with start_span("redis.publish", "producer", **{"messaging.channel": channel}):
+            get_redis().publish(channel, json.dumps(payload))
+    except Exception as e:
+        logging.warning(f"Failed to publish event to {channel}: {str(e)}")
@@ -0,0 +1,32 @@
+import time
+from urllib.parse import urlsplit
+import requests
+from .metrics import observe_upstream
+from .tracing import start_span, outgoing_headers
+
+
+class ServiceSession(requests.Session):
+    """Session for calls to other services that records their latency and
+    carries the current trace to the next hop
+
+    Sharing one session also keeps connections to each service alive
+    between calls instead of reconnecting every time.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        target = urlsplit(url).netloc
+        with start_span(f"{method.upper()} {target}", "client", **{"http.url": url}) as span:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **outgoing_headers()}
+            started = time.perf_counter()
+            status = "error"
+            try:
+                response = super().request(method, url, *args, **kwargs)
+                status = str(response.status_code)
+                return response
+            finally:
+                observe_upstream(target, method.upper(), status, time.perf_counter() - started)
+                if span is not None:
+                    span.attributes["http.status_code"] = status
+
+
+http = ServiceSession()
@@ -15,9 +15,45 @@ class User(db.Model):
     is_banned = db.Column(db.Boolean, nullable=False, default=False)
     is_root_admin = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Moves forward on every change so other services can pull what changed.
+    # Also set on insert: databases migrated on SQLite have no column default.
+    updated_at = db.Column(
+        db.DateTime(timezone=True), default=func.now(), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        db.Index("ix_users_updated_at", "updated_at", "id"),
+    )
+
+    def to_directory(self):
+        """The fields other services replicate, as published in user events"""
+        return {
+            "id": self.id,
+            "email": self.email,
+            "full_name": self.full_name,
+            "is_approved": self.is_approved,
+            "is_banned": self.is_banned,
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+class DeletedUser(db.Model):
+    """Tombstone of a deleted user, so replicas learn about the deletion"""
+    __tablename__ = "deleted_users"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    deleted_at = db.Column(db.DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_deleted_users_deleted_at", "deleted_at", "id"),
+    )
+
+    def to_directory(self):
+        return {"id": self.id, "deleted_at": self.deleted_at.isoformat()}
 
 def init_db(app):
-    """Initialize database"""
+    """Initialize database and apply pending schema migrations"""
     db.init_app(app)
-    with app.app_context():
-        db.create_all()
+    if app.config.get("MIGRATE_ON_STARTUP", True):
+        from .migrations import migrate
+        with app.app_context():
+            migrate(db.engine)
@@ -102,3 +102,28 @@ async function authFetch(url, options = {}) {
   }
   return fetch(url, { ...options, headers });
 }
+
+// Fetch several GET endpoints in one round trip through the gateway's /api/batch.
+// Resolves to a map of path -> Response, or null if batching is unavailable so
+// callers can fall back to individual requests.
+async function batchGet(paths) {
+  try {
+    const res = await authFetch("/api/batch", {
+      method: "POST",
+      body: { requests: paths.map(path => ({ id: path, path })) },
+    });
+    if (!res.ok) return null;
+    const json = await res.json();
+    const results = {};
+    (json.responses || []).forEach(item => {
+      results[item.id] = new Response(JSON.stringify(item.body), {
+        status: item.status,
+        headers: { "Content-Type": "application/json" },
+      });
+    });
+    return results;
+  } catch (e) {
+    console.warn("Batch request failed, falling back to individual requests", e);
+    return null;
+  }
+}
@@ -17,9 +17,21 @@ document.addEventListener("DOMContentLoaded", async () => {
   const role = getRole();
   if (roleBadge) roleBadge.textContent = role || "guest";
 
+  // Load everything the dashboard needs in one round trip; each loader falls
+  // back to its own request if the batch is unavailable
+  const prefetched = (await batchGet([
+    "/api/users/me",
+    "/api/tournaments/leaderboard?limit=10",
+    "/api/tournaments/leaderboard/me",
+    "/api/tournaments?status=active&fields=id&limit=200",
+    "/api/users/notifications?limit=10",
+    "/api/users/notifications?limit=5",
+    "/api/users/blog/posts?limit=3",
+  ])) || {};
+
   // Try to load the current user info for display
   try {
-    const res = await authFetch("/api/users/me");
+    const res = prefetched["/api/users/me"] || await authFetch("/api/users/me");
     if (res.ok) {
       const me = await res.json();
       if (userDisplay) userDisplay.textContent = me.full_name || me.email || "Unknown";
@@ -44,10 +56,10 @@ document.addEventListener("DOMContentLoaded", async () => {
   }
 
   // Initialize features
-  await loadDashboardStats();
-  await loadNotifications();
-  await loadRecentNotifications();
-  await loadLatestBlogPosts();
+  await loadDashboardStats(null, prefetched);
+  await loadNotifications(prefetched["/api/users/notifications?limit=10"]);
+  await loadRecentNotifications(prefetched["/api/users/notifications?limit=5"]);
+  await loadLatestBlogPosts(prefetched["/api/users/blog/posts?limit=3"]);
   initializeRealTimeUpdates();
   
   // Refresh notifications periodically
@@ -55,36 +67,38 @@ document.addEventListener("DOMContentLoaded", async () => {
 });
 
 // Load dashboard statistics (and optionally update live leaderboard widget from real-time data)
-async function loadDashboardStats(leaderboardData = null) {
+async function loadDashboardStats(leaderboardData = null, prefetched = {}) {
   try {
     let data = null;
     if (leaderboardData && Array.isArray(leaderboardData)) {
       data = { leaderboard: leaderboardData };
     } else {
-      const leaderboardRes = await authFetch("/api/tournaments/leaderboard");
+      const leaderboardPath = "/api/tournaments/leaderboard?limit=10";
+      const leaderboardRes = prefetched[leaderboardPath] || await authFetch(leaderboardPath);
       if (leaderboardRes.ok) data = await leaderboardRes.json();
-    }
-    if (data && data.leaderboard) {
-      const currentUserEmail = getEmail();
-      const currentUserName = window.currentUserName || "";
-      const userEntry = data.leaderboard.find(
-        entry => entry.email === currentUserEmail || entry.user_name === currentUserEmail || entry.user_name === currentUserName
-      );
-      if (userEntry) {
+
+      // The user's own rank comes from its own lookup, not from scanning the board
+      const standingPath = "/api/tournaments/leaderboard/me";
+      const standingRes = prefetched[standingPath] || await authFetch(standingPath);
+      if (standingRes.ok) {
+        const userEntry = (await standingRes.json()).standing;
         const rankEl = document.getElementById("userRank");
         const pointsEl = document.getElementById("userPoints");
-        if (rankEl) rankEl.textContent = "#" + (userEntry.rank != null ? userEntry.rank : "—");
-        if (pointsEl) pointsEl.textContent = String(userEntry.points != null ? userEntry.points : 0);
+        if (rankEl) rankEl.textContent = "#" + (userEntry && userEntry.rank != null ? userEntry.rank : "—");
+        if (pointsEl) pointsEl.textContent = String(userEntry ? userEntry.points : 0);
       }
+    }
+    if (data && data.leaderboard) {
       updateLiveLeaderboard(data.leaderboard);
     }
 
     if (!leaderboardData) {
-      const tournamentsRes = await authFetch("/api/tournaments");
+      const activePath = "/api/tournaments?status=active&fields=id&limit=200";
+      const tournamentsRes = prefetched[activePath] || await authFetch(activePath);
       if (tournamentsRes.ok) {
         const json = await tournamentsRes.json();
         const list = Array.isArray(json) ? json : (json.tournaments || []);
-        const activeTournaments = list.filter(t => t.status === "active").length;
+        const activeTournaments = json.next_cursor ? list.length + "+" : list.length;
         const el = document.getElementById("activeTournaments");
         if (el) el.textContent = activeTournaments;
       }
@@ -121,14 +135,14 @@ function updateLiveLeaderboard(leaderboard) {
 }
 
 // Load notifications for dropdown
-async function loadNotifications() {
+async function loadNotifications(prefetchedRes = null) {
   const dropdown = document.getElementById("notificationDropdown");
   const badge = document.getElementById("notificationBadge");
   
   if (!dropdown) return;
   
   try {
-    const res = await authFetch("/api/users/notifications?limit=10");
+    const res = prefetchedRes || await authFetch("/api/users/notifications?limit=10");
     if (res.ok) {
       const notifications = await res.json();
       
@@ -198,12 +212,12 @@ async function loadNotifications() {
 }
 
 // Load recent notifications for dashboard widget
-async function loadRecentNotifications() {
+async function loadRecentNotifications(prefetchedRes = null) {
   const container = document.getElementById("recentNotifications");
   if (!container) return;
   
   try {
-    const res = await authFetch("/api/users/notifications?limit=5");
+    const res = prefetchedRes || await authFetch("/api/users/notifications?limit=5");
     if (res.ok) {
       const notifications = await res.json();
       
@@ -240,12 +254,12 @@ async function loadRecentNotifications() {
 }
 
 // Load latest blog posts
-async function loadLatestBlogPosts() {
+async function loadLatestBlogPosts(prefetchedRes = null) {
   const container = document.getElementById("latestBlogPosts");
   if (!container) return;
   
   try {
-    const res = await fetch("/api/users/blog/posts?limit=3");
+    const res = prefetchedRes || await fetch("/api/users/blog/posts?limit=3");
     if (res.ok) {
       const posts = await res.json();
       
@@ -21,7 +21,7 @@ async function fetchLeaderboard() {
         }
 
         console.log('[Leaderboard] Fetching from:', `${API_BASE}/leaderboard`);
-        const response = await fetch(`${API_BASE}/leaderboard`, {
+        const response = await fetch(`${API_BASE}/leaderboard?limit=500`, {
             headers: {
                 'Authorization': `Bearer ${token}`,
                 'Content-Type': 'application/json'
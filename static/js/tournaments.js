@@ -99,19 +99,28 @@ async function loadTournaments() {
             'Authorization': `Bearer ${localStorage.getItem('access_token') || localStorage.getItem('token')}`
         };
         
-        const response = await fetchFn(API_BASE + '/', {
-            method: 'GET',
-            headers: headers
-        });
-
-        if (response.ok) {
+        // The listing is paginated; follow next_cursor until the last page
+        const tournaments = [];
+        let cursor = null;
+        do {
+            const query = '?limit=200' + (cursor ? '&cursor=' + encodeURIComponent(cursor) : '');
+            const response = await fetchFn(API_BASE + '/' + query, {
+                method: 'GET',
+                headers: headers
+            });
+
+            if (!response.ok) {
+                console.error('Failed to load tournaments:', response.status, response.statusText);
+                showEmptyState();
+                return;
+            }
             const data = await response.json();
-            currentTournaments = data.tournaments || [];
-            renderTournaments();
-        } else {
-            console.error('Failed to load tournaments:', response.status, response.statusText);
-            showEmptyState();
-        }
+            tournaments.push(...(data.tournaments || []));
+            cursor = data.next_cursor;
+        } while (cursor);
+
+        currentTournaments = tournaments;
+        renderTournaments();
     } catch (error) {
         console.error('Error loading tournaments:', error);
         showEmptyState();
@@ -360,6 +369,9 @@ async function openParticipantModal(tournamentId) {
     if (!currentTournament) return;
 
     // Load pending requests and available users
+    selectedUsers = new Map();
+    const userSearch = document.getElementById('userSearch');
+    if (userSearch) userSearch.value = '';
     await loadPendingParticipants();
     await loadAvailableUsers();
 
@@ -441,12 +453,44 @@ async function approveParticipant(participantId) {
     }
 }
 
+// Users picked in the participant modal (id -> name), kept across searches
+let selectedUsers = new Map();
+let usersCursor = null;
+let userSearchTimer = null;
+
+/**
+ * Search again shortly after the user stops typing
+ */
+function searchAvailableUsers() {
+    clearTimeout(userSearchTimer);
+    userSearchTimer = setTimeout(() => loadAvailableUsers(true), 250);
+}
+
 /**
- * Load available users for tournament
+ * Remember a user's checkbox state
  */
-async function loadAvailableUsers() {
+function toggleUserSelection(checkbox) {
+    if (checkbox.checked) {
+        selectedUsers.set(parseInt(checkbox.value), checkbox.dataset.name);
+    } else {
+        selectedUsers.delete(parseInt(checkbox.value));
+    }
+}
+
+/**
+ * Load available users for tournament, a page at a time
+ * (reset starts over from the first page of the current search)
+ */
+async function loadAvailableUsers(reset = true) {
     const usersList = document.getElementById('usersList');
     if (!usersList) return;
+    const moreButton = document.getElementById('moreUsersButton');
+    const search = document.getElementById('userSearch');
+
+    if (reset) usersCursor = null;
+    const params = new URLSearchParams();
+    if (search && search.value.trim()) params.set('q', search.value.trim());
+    if (usersCursor) params.set('cursor', usersCursor);
 
     try {
         const fetchFn = typeof authFetch !== 'undefined' ? authFetch : fetch;
@@ -455,7 +499,7 @@ async function loadAvailableUsers() {
             'Authorization': `Bearer ${localStorage.getItem('access_token') || localStorage.getItem('token')}`
         };
 
-        const response = await fetchFn(`${API_BASE}/available-users`, {
+        const response = await fetchFn(`${API_BASE}/available-users?${params}`, {
             method: 'GET',
             headers: headers
         });
@@ -463,21 +507,29 @@ async function loadAvailableUsers() {
         if (response.ok) {
             const data = await response.json();
             const users = data.users || [];
-            
-            if (users.length === 0) {
+            usersCursor = data.next_cursor;
+            if (moreButton) moreButton.classList.toggle('d-none', !usersCursor);
+
+            if (reset && users.length === 0) {
                 usersList.innerHTML = '<p class="text-muted">No users available</p>';
                 return;
             }
 
-            usersList.innerHTML = users.map(user => `
+            const html = users.map(user => `
                 <div class="form-check mb-2">
                     <input class="form-check-input user-checkbox" type="checkbox" value="${user.id}" 
-                           id="user-${user.id}" data-name="${escapeHtml(user.name)}">
+                           id="user-${user.id}" data-name="${escapeHtml(user.name)}"
+                           onchange="toggleUserSelection(this)" ${selectedUsers.has(user.id) ? 'checked' : ''}>
                     <label class="form-check-label" for="user-${user.id}">
                         ${escapeHtml(user.name)} <small class="text-muted">(${escapeHtml(user.email)})</small>
                     </label>
                 </div>
             `).join('');
+            if (reset) {
+                usersList.innerHTML = html;
+            } else {
+                usersList.insertAdjacentHTML('beforeend', html);
+            }
         } else {
             usersList.innerHTML = '<p class="text-danger">Failed to load users</p>';
         }
@@ -493,15 +545,14 @@ async function loadAvailableUsers() {
 async function addSelectedUsers() {
     if (!currentTournament) return;
 
-    const checkboxes = document.querySelectorAll('.user-checkbox:checked');
-    if (checkboxes.length === 0) {
+    if (selectedUsers.size === 0) {
         alert('Please select at least one user');
         return;
     }
 
-    const participants = Array.from(checkboxes).map(cb => ({
-        user_id: parseInt(cb.value),
-        name: cb.dataset.name
+    const participants = Array.from(selectedUsers, ([userId, name]) => ({
+        user_id: userId,
+        name: name
     }));
 
     try {
@@ -740,13 +791,13 @@ async function generateBracket(tournamentId) {
 async function viewBracket(tournamentId) {
     try {
         // Use authFetch to include JWT token
-        const response = await authFetch(`${API_BASE}/${tournamentId}/bracket`, {
+        const response = await authFetch(`${API_BASE}/${tournamentId}/bracket?format=compact`, {
             method: 'GET'
         });
 
         if (response.ok) {
             const data = await response.json();
-            await renderBracket(data.tournament, data.bracket);
+            await renderBracket(data.tournament, expandCompactBracket(data));
             
             const modal = new bootstrap.Modal(document.getElementById('bracketModal'));
             modal.show();
@@ -767,6 +818,23 @@ async function viewBracket(tournamentId) {
     }
 }
 
+/**
+ * Rebuild match objects from a compact bracket, whose matches are rows of
+ * ids referencing a single participant table
+ */
+function expandCompactBracket(data) {
+    const participants = new Map((data.participants || []).map(p => [p.id, p]));
+    return (data.matches || []).map(row => {
+        const match = {};
+        data.match_fields.forEach((field, i) => { match[field] = row[i]; });
+        match.tournament_id = data.tournament.id;
+        match.participant1 = participants.get(match.participant1_id) || null;
+        match.participant2 = participants.get(match.participant2_id) || null;
+        match.winner = participants.get(match.winner_id) || null;
+        return match;
+    });
+}
+
 /**
  * Render bracket visualization
  */
@@ -860,6 +928,7 @@ async function renderBracket(tournament, bracket) {
                 ${(canRecordResult && canRecordAsRole) ? `<button class="btn btn-sm btn-outline-primary mt-2 w-100 record-result-btn" 
                     data-tournament-id="${tournament.id}" 
                     data-bracket-id="${match.id}"
+                    data-version="${match.version}"
                     data-p1-id="${match.participant1?.id || 0}"
                     data-p1-name="${escapeHtml(match.participant1?.name || '')}"
                     data-p2-id="${match.participant2?.id || 0}"
@@ -899,7 +968,7 @@ async function renderBracket(tournament, bracket) {
                 id: parseInt(this.dataset.p2Id),
                 name: this.dataset.p2Name
             };
-            openResultModal(tournamentId, bracketId, participant1, participant2);
+            openResultModal(tournamentId, bracketId, participant1, participant2, parseInt(this.dataset.version));
         });
     });
 }
@@ -923,10 +992,11 @@ let currentMatch = null;
 /**
  * Open result recording modal
  */
-function openResultModal(tournamentId, bracketId, participant1, participant2) {
+function openResultModal(tournamentId, bracketId, participant1, participant2, version) {
     currentMatch = {
         tournamentId: tournamentId,
         bracketId: bracketId,
+        version: version,
         participant1: participant1,
         participant2: participant2
     };
@@ -990,6 +1060,8 @@ async function recordMatchResult() {
 
         const body = { winner_id: winnerId };
         if (score) body.score = score;
+        // Lets the server reject the result if someone else recorded one first
+        if (Number.isInteger(currentMatch.version)) body.version = currentMatch.version;
 
         const response = await fetchFn(
             `${API_BASE}/${currentMatch.tournamentId}/bracket/${currentMatch.bracketId}/result`,
@@ -1013,7 +1085,7 @@ async function recordMatchResult() {
             let errorMessage = 'Failed to record result';
             try {
                 const errorData = await response.json();
-                errorMessage = errorData.error || errorData.message || errorData.msg || errorMessage;
+                errorMessage = errorData.detail || errorData.error || errorData.message || errorData.msg || errorMessage;
             } catch (e) {
                 errorMessage = response.statusText || errorMessage;
             }